@@ -0,0 +1,151 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from numpy.lib.stride_tricks import sliding_window_view
+from statsmodels.tsa.arima.model import ARIMA
+
+import data_loader
+import profiling
+
+# fits the same ARIMA order for every column of a wide price matrix
+# - differencing and the lagged design matrix are built once for all tickers
+#   and give least-squares start params, so each optimizer starts near the answer
+# - the optimizations run in a process pool
+# - fitted params are cached on disk per (ticker, data hash, order), so a rerun
+#   on unchanged data only runs the Kalman filter and skips estimation
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'arima')
+
+def start_params_batch(prices_df, order=(5,1,0)):
+    """
+    Least-squares ARIMA start params for every column at once.
+    Returns {ticker: params array} in statsmodels' ARIMA param order.
+    """
+    p, d, q = order
+    values = prices_df.to_numpy(dtype=np.float64)
+    diffed = np.diff(values, n=d, axis=0) if d else values
+
+    # demean when statsmodels adds a constant (d == 0), otherwise fit as is
+    const = np.nanmean(diffed, axis=0) if d == 0 else np.zeros(diffed.shape[1])
+    y_all = diffed - const
+
+    if p:
+        # (samples, tickers, p) view of lagged values, newest lag first
+        lags = sliding_window_view(y_all[:-1], p, axis=0)[..., ::-1]
+        y = y_all[p:]
+        valid = ~np.isnan(y) & ~np.isnan(lags).any(axis=-1)
+        X = np.where(valid[..., None], lags, 0.0)
+        y = np.where(valid, y, 0.0)
+
+        xtx = np.einsum('ntp,ntq->tpq', X, X) + 1e-10 * np.eye(p)
+        xty = np.einsum('ntp,nt->tp', X, y)
+        ar = np.linalg.solve(xtx, xty[..., None])[..., 0]
+        resid = y - np.einsum('ntp,tp->nt', X, ar)
+        sigma2 = (resid ** 2).sum(axis=0) / np.maximum(valid.sum(axis=0) - p, 1)
+    else:
+        ar = np.zeros((diffed.shape[1], 0))
+        sigma2 = np.nanvar(y_all, axis=0)
+
+    # keep the start point stationary, otherwise statsmodels rejects it
+    ar = np.clip(ar, -0.9 / max(p, 1), 0.9 / max(p, 1))
+
+    params = {}
+    for j, ticker in enumerate(prices_df.columns):
+        parts = [const[j:j + 1]] if d == 0 else []
+        parts += [ar[j], np.zeros(q), [max(sigma2[j], 1e-8)]]
+        params[ticker] = np.concatenate(parts)
+    return params
+
+def _group_by_order(tickers, orders):
+    groups = {}
+    for ticker in tickers:
+        groups.setdefault(tuple(orders.get(ticker, (5,1,0))), []).append(ticker)
+    return groups
+
+def _cache_path(cache_dir, ticker, key, order):
+    name = f"{ticker}-{'_'.join(map(str, order))}-{key}.npy"
+    return os.path.join(cache_dir, name)
+
+def _fit_one(args):
+    values, order, start_params = args
+    try:
+        return ARIMA(values, order=order).fit(start_params=start_params).params
+    except Exception as e:
+        print(f"ARIMA fit failed ({e})")
+        return None
+
+def fit_arima_batch(prices_df, order=(5,1,0), cache_dir=CACHE_DIR, n_jobs=None):
+    """
+    Estimates ARIMA(order) for every column of prices_df.
+    order: one (p,d,q) for all tickers, or {ticker: order} such as
+           arima_select.best_orders() (missing tickers use (5,1,0))
+    Returns {ticker: fitted params array, or None if the fit failed}.
+    """
+    if isinstance(order, dict):
+        params = {}
+        for o, tickers in _group_by_order(prices_df.columns, order).items():
+            params.update(fit_arima_batch(prices_df[tickers], o, cache_dir, n_jobs))
+        return params
+
+    os.makedirs(cache_dir, exist_ok=True)
+    params = {}
+    todo = []
+
+    for ticker in prices_df.columns:
+        series = prices_df[ticker].dropna()
+        path = _cache_path(cache_dir, ticker, data_loader.fingerprint(series), order)
+        if os.path.exists(path):
+            params[ticker] = np.load(path)
+        else:
+            todo.append((ticker, series.to_numpy(), path))
+
+    if todo:
+        starts = start_params_batch(prices_df[[t for t, _, _ in todo]], order)
+        tasks = [(values, order, starts[ticker]) for ticker, values, _ in todo]
+
+        if n_jobs == 1 or len(tasks) == 1:
+            fitted = [_fit_one(t) for t in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                fitted = list(pool.map(_fit_one, tasks))
+
+        for (ticker, _, path), fit_params in zip(todo, fitted):
+            params[ticker] = fit_params
+            if fit_params is not None:
+                np.save(path, fit_params)
+
+    return params
+
+def generate_arima_batch_signals(prices_df, order=(5,1,0), cache_dir=CACHE_DIR, n_jobs=None):
+    """
+    Same signals as strategies.generate_arima_signals for every ticker,
+    with estimation batched / cached through fit_arima_batch.
+    order: one (p,d,q) for all tickers, or {ticker: order}
+    Returns {ticker: signals_dataframe}.
+    """
+    with profiling.span('fit'):
+        params = fit_arima_batch(prices_df, order, cache_dir, n_jobs)
+    orders = order if isinstance(order, dict) else {}
+    signals_dict = {}
+
+    for ticker in prices_df.columns:
+        with profiling.span(ticker):
+            prices = prices_df[ticker].dropna()
+            signals = pd.DataFrame(index=prices.index)
+            signals['price'] = prices
+
+            if params[ticker] is None:
+                print("ARIMA convergence failed, returning empty signals")
+                signals['positions'] = 0.0
+            else:
+                # params are known, so filter() gives the fitted values without optimizing
+                ticker_order = tuple(orders.get(ticker, (5,1,0))) if orders else order
+                model_fit = ARIMA(prices.to_numpy(), order=ticker_order).filter(params[ticker])
+                signals['predicted_price'] = model_fit.fittedvalues
+                signals['signal'] = np.where(signals['predicted_price'] > signals['price'], 1.0, 0.0)
+                signals['positions'] = signals['signal'].diff()
+
+        signals_dict[ticker] = signals
+
+    return signals_dict
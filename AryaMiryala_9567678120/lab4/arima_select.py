@@ -0,0 +1,126 @@
+import os
+import json
+import itertools
+import warnings
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from statsmodels.tsa.arima.model import ARIMA
+
+import data_loader
+
+# automatic ARIMA order selection
+# every (p,d,q) candidate gets a short first pass (a few optimizer iterations);
+# candidates whose criterion is already far behind the leader are dropped and
+# only the survivors are fitted to convergence, warm-started from the first pass
+
+ORDERS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'arima_orders.json')
+
+def order_grid(p_values=range(0, 6), d_values=(1,), q_values=range(0, 3)):
+    """All (p,d,q) combinations, skipping the empty (0,d,0) model."""
+    return [o for o in itertools.product(p_values, d_values, q_values) if o[0] or o[2]]
+
+def _fit_candidate(args):
+    ticker, values, order, maxiter, start_params, criterion = args
+    try:
+        with warnings.catch_warnings():
+            # short first passes never converge, that is the point
+            warnings.simplefilter('ignore')
+            model_fit = ARIMA(values, order=order).fit(
+                start_params=start_params, method_kwargs={'maxiter': maxiter}
+            )
+        return ticker, order, getattr(model_fit, criterion), model_fit.params
+    except Exception as e:
+        print(f"ARIMA{order} failed for {ticker} ({e})")
+        return ticker, order, np.inf, None
+
+def _run(tasks, pool):
+    if pool is None:
+        return [_fit_candidate(t) for t in tasks]
+    return list(pool.map(_fit_candidate, tasks))
+
+def select_orders(prices_df, orders=None, criterion='aic', first_pass_iter=5, margin=10.0,
+                  maxiter=50, n_jobs=None, path=ORDERS_PATH):
+    """
+    Picks the best ARIMA order for every ticker in prices_df.
+    criterion: 'aic' or 'bic'
+    margin: candidates more than this many points behind the first-pass leader
+            are abandoned before the full fit
+    Returns {ticker: {'order', criterion, 'ranking'}} and persists the winners to
+    `path`; tickers whose data is unchanged since the last run are not refitted.
+    """
+    if criterion not in ('aic', 'bic'):
+        raise ValueError(f"Unknown criterion: {criterion}")
+    orders = order_grid() if orders is None else [tuple(o) for o in orders]
+    saved = load_orders(path)
+
+    results = {}
+    series = {}
+    for ticker in prices_df.columns:
+        values = prices_df[ticker].dropna()
+        key = data_loader.fingerprint(values)
+        entry = saved.get(ticker)
+        if entry and entry['fingerprint'] == key and entry['criterion'] == criterion \
+                and set(map(tuple, entry['candidates'])) == set(orders):
+            results[ticker] = entry
+        else:
+            series[ticker] = (values.to_numpy(), key)
+
+    pool = None if n_jobs == 1 or not series else ProcessPoolExecutor(max_workers=n_jobs)
+    try:
+        # first pass: every candidate, a few iterations each
+        tasks = [
+            (ticker, values, order, first_pass_iter, None, criterion)
+            for ticker, (values, _) in series.items() for order in orders
+        ]
+        first = {}
+        for ticker, order, score, params in _run(tasks, pool):
+            first.setdefault(ticker, []).append((score, order, params))
+
+        # second pass: full fits for candidates still in the running
+        tasks = []
+        for ticker, candidates in first.items():
+            best = min(score for score, _, _ in candidates)
+            for score, order, params in candidates:
+                if params is not None and score <= best + margin:
+                    tasks.append((ticker, series[ticker][0], order, maxiter, params, criterion))
+
+        final = {}
+        for ticker, order, score, _ in _run(tasks, pool):
+            final.setdefault(ticker, []).append((score, order))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    for ticker, (_, key) in series.items():
+        ranking = sorted(final.get(ticker, []))
+        if not ranking or not np.isfinite(ranking[0][0]):
+            print(f"No ARIMA order converged for {ticker}, keeping (5,1,0)")
+            ranking = [(np.inf, (5, 1, 0))]
+        results[ticker] = {
+            'order': list(ranking[0][1]),
+            criterion: float(ranking[0][0]),
+            'criterion': criterion,
+            'ranking': [[list(o), float(s)] for s, o in ranking],
+            'candidates': [list(o) for o in orders],
+            'fingerprint': key,
+        }
+
+    saved.update(results)
+    save_orders(saved, path)
+    return results
+
+def load_orders(path=ORDERS_PATH):
+    """Persisted selections, {ticker: entry} (empty if nothing saved yet)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_orders(entries, path=ORDERS_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(entries, f, indent=2)
+
+def best_orders(path=ORDERS_PATH):
+    """{ticker: order tuple} from the persisted selections, e.g. for arima_batch."""
+    return {t: tuple(e['order']) for t, e in load_orders(path).items()}
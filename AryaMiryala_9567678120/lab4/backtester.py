@@ -1,6 +1,9 @@
 import pandas as pd
 import numpy as np
 
+import events
+import ledger
+
 class Portfolio:
     def __init__(self, initial_capital, transaction_cost=5.00):
         """
@@ -10,58 +13,327 @@ class Portfolio:
         self.cash = initial_capital
         self.transaction_cost = transaction_cost
         self.holdings = {}  
-        self.history = []   
+        self.ledger = ledger.Ledger() # daily equity / holdings snapshots and the fill log
 
-    def run_backtest(self, price_df, signals_dict):
+    def run_backtest(self, price_df, signals_dict, engine='loop'):
         """
         price_df: DataFrame with columns as tickers, index as dates
-        signals_dict: Dictionary {ticker: signals_dataframe}
+        signals_dict: Dictionary {ticker: signals_dataframe}, or the compact
+                      forms: an events.SignalEvents or a (dates, tickers) int8 matrix
+        engine: 'loop' walks the frames with .loc, 'array' aligns everything
+                into numpy matrices first (use this for large universes)
         """
+        if engine == 'array':
+            return self._run_backtest_array(price_df, signals_dict)
+        if engine != 'loop':
+            raise ValueError(f"Unknown engine: {engine}")
         
         for ticker in price_df.columns:
             self.holdings[ticker] = 0
+            self.ledger.column(ticker)
+        self.ledger.reserve(len(price_df.index))
+
+        compact = None
+        if not isinstance(signals_dict, dict):
+            compact = align_positions(price_df, signals_dict)
 
         # Loop through every day 
-        for date in price_df.index:
-            daily_value = self.cash
+        for i, date in enumerate(price_df.index):
+            prices = {}
+            signals = {}
             
-            for ticker in price_df.columns:
-                current_price = price_df.loc[date, ticker]
+            for j, ticker in enumerate(price_df.columns):
+                prices[ticker] = price_df.loc[date, ticker]
                 
                 # Check if signal in this day
-                if date in signals_dict[ticker].index:
-                    signal = signals_dict[ticker].loc[date, 'positions']
-                    
-                    # BUY
-                    if signal == 1.0:
-                        if self.cash > current_price + self.transaction_cost:
-                            shares_to_buy = (self.cash * 0.2) // current_price # Invest 20% of cash
-                            if shares_to_buy > 0:
-                                cost = (shares_to_buy * current_price) + self.transaction_cost
-                                self.cash -= cost
-                                self.holdings[ticker] += shares_to_buy
-                                # print(f"BOUGHT {ticker} on {date}")
-
-                    # SELL
-                    elif signal == -1.0:
-                        if self.holdings[ticker] > 0:
-                            revenue = (self.holdings[ticker] * current_price) - self.transaction_cost
-                            self.cash += revenue
-                            self.holdings[ticker] = 0
-                            # print(f"SOLD {ticker} on {date}")
-
-                # Add stock value to daily total
-                daily_value += self.holdings[ticker] * current_price
-
-            self.history.append({'Date': date, 'Total Value': daily_value})
-
-        return pd.DataFrame(self.history).set_index('Date')
-
-def calculate_metrics(portfolio_history, initial_capital):
-    final_val = portfolio_history['Total Value'].iloc[-1]
+                if compact is not None:
+                    signals[ticker] = compact[i, j]
+                elif date in signals_dict[ticker].index:
+                    signals[ticker] = signals_dict[ticker].loc[date, 'positions']
+
+            self.on_bar(date, prices, signals)
+
+        return self.ledger.equity_frame()
+
+    def on_bar(self, date, prices, signals):
+        """
+        Applies one bar: trades on the signals, then records the day's value.
+        prices: {ticker: price}, signals: {ticker: positions value}, tickers
+        without a signal this bar are left out. Used by the loop engine and by
+        the event-driven mode in streaming.py. Returns the bar's total value.
+        """
+        daily_value = self.cash
+        
+        for ticker, current_price in prices.items():
+            self.holdings.setdefault(ticker, 0)
+            signal = signals.get(ticker)
+            
+            # BUY
+            if signal == 1.0:
+                if self.cash > current_price + self.transaction_cost:
+                    shares_to_buy = (self.cash * 0.2) // current_price # Invest 20% of cash
+                    if shares_to_buy > 0:
+                        cost = (shares_to_buy * current_price) + self.transaction_cost
+                        self.cash -= cost
+                        self.holdings[ticker] += shares_to_buy
+                        self.ledger.record_fill(date, ticker, ledger.BUY, shares_to_buy, current_price, self.transaction_cost)
+                        # print(f"BOUGHT {ticker} on {date}")
+
+            # SELL
+            elif signal == -1.0:
+                if self.holdings[ticker] > 0:
+                    revenue = (self.holdings[ticker] * current_price) - self.transaction_cost
+                    self.cash += revenue
+                    self.ledger.record_fill(date, ticker, ledger.SELL, self.holdings[ticker], current_price, self.transaction_cost)
+                    self.holdings[ticker] = 0
+                    # print(f"SOLD {ticker} on {date}")
+
+            # Add stock value to daily total
+            daily_value += self.holdings[ticker] * current_price
+
+        self.ledger.record_bar(date, self.cash, daily_value, self.holdings)
+        return daily_value
+
+    def _run_backtest_array(self, price_df, signals_dict):
+        prices = price_df.to_numpy(dtype=np.float64)
+        positions = align_positions(price_df, signals_dict)
+
+        self.ledger = ledger.Ledger(price_df.columns)
+        values, self.cash, holdings = simulate_positions(
+            prices, positions, self.cash, self.transaction_cost,
+            record=self.ledger, dates=price_df.index
+        )
+        self.holdings = dict(zip(price_df.columns, holdings))
+
+        return self.ledger.equity_frame()
+
+def align_positions(price_df, signals_dict):
+    """
+    Reindexes every ticker's 'positions' column onto the price index and
+    returns a dense (dates, tickers) int8 array of +1 / -1 / 0. Dates without
+    a signal are 0. Also takes an events.SignalEvents, or a (dates, tickers)
+    matrix already aligned with price_df.
+    """
+    if isinstance(signals_dict, events.SignalEvents):
+        return signals_dict.to_dense(price_df.index, price_df.columns)
+    if not isinstance(signals_dict, dict):
+        positions = np.asarray(signals_dict)
+        if positions.shape != price_df.shape:
+            raise ValueError(f"positions shape {positions.shape} does not match prices {price_df.shape}")
+        return positions
+
+    positions = np.zeros(price_df.shape, dtype=np.int8)
+    for j, ticker in enumerate(price_df.columns):
+        pos = signals_dict[ticker]['positions'].reindex(price_df.index).to_numpy()
+        # anything but an exact +1 / -1 is never traded, so it can be dropped
+        positions[:, j] = np.where(pos == 1.0, 1, np.where(pos == -1.0, -1, 0))
+    return positions
+
+def simulate_positions(prices, positions, initial_cash, transaction_cost, holdings=None, record=None, dates=None):
+    """
+    Same rules as Portfolio.run_backtest on plain arrays.
+    prices, positions: (dates, tickers) arrays, positions holds +1 / -1 / 0
+    holdings: shares held going in (None = flat), lets a run continue over
+              the next block of dates
+    record: optional ledger.Ledger (columns in prices' ticker order) that gets
+            every bar and fill, dates are then the row dates
+    Returns (daily total values, final cash, final holdings array).
+    """
+    n_dates, n_tickers = prices.shape
+    cash = initial_cash
+    holdings = np.zeros(n_tickers) if holdings is None else np.array(holdings, dtype=np.float64)
+    values = np.empty(n_dates)
+
+    # only cells with a +1/-1 need python-level work, find them all up front
+    event_dates, event_tickers = np.nonzero((positions == 1.0) | (positions == -1.0))
+    bounds = np.searchsorted(event_dates, np.arange(n_dates + 1))
+
+    if record is not None:
+        record.reserve(n_dates)
+        first = record.n_bars
+        cash_after = np.empty(n_dates)
+
+    for d in range(n_dates):
+        # like the loop engine, the day is valued against the cash at the open
+        open_cash = cash
+        row = prices[d]
+
+        for j in event_tickers[bounds[d]:bounds[d + 1]]:
+            current_price = row[j]
+            if positions[d, j] == 1.0:
+                if cash > current_price + transaction_cost:
+                    shares_to_buy = (cash * 0.2) // current_price
+                    if shares_to_buy > 0:
+                        cash -= (shares_to_buy * current_price) + transaction_cost
+                        holdings[j] += shares_to_buy
+                        if record is not None:
+                            record.record_fill(dates[d], record.tickers[j], ledger.BUY, shares_to_buy, current_price, transaction_cost)
+            elif holdings[j] > 0:
+                cash += (holdings[j] * current_price) - transaction_cost
+                if record is not None:
+                    record.record_fill(dates[d], record.tickers[j], ledger.SELL, holdings[j], current_price, transaction_cost)
+                holdings[j] = 0
+
+        values[d] = open_cash + holdings @ row
+        if record is not None:
+            record.holdings[first + d] = holdings
+            cash_after[d] = cash
+
+    if record is not None:
+        bars = record.equity[first:first + n_dates]
+        bars['date'] = pd.DatetimeIndex(dates).as_unit('ns').asi8
+        bars['cash'] = cash_after
+        bars['value'] = values
+        record.n_bars += n_dates
+
+    return values, cash, holdings
+
+def run_backtest_blocks(universe, positions, initial_capital, transaction_cost=5.00, rows=2000):
+    """
+    run_backtest for a universe.LazyUniverse: walks the calendar `rows` dates
+    at a time, carrying cash and holdings between blocks, so only one block
+    of prices is in memory.
+    positions: (calendar dates, tickers) matrix, e.g. from universe.block_positions
+    """
+    cash, holdings = initial_capital, None
+    values = []
+    for first, prices in universe.date_blocks(rows):
+        block_values, cash, holdings = simulate_positions(
+            prices, positions[first:first + len(prices)], cash, transaction_cost, holdings
+        )
+        values.append(block_values)
+
+    values = np.concatenate(values) if values else np.zeros(0)
+    return pd.DataFrame({'Total Value': values}, index=universe.dates())
+
+def _batch_events(positions):
+    # every +1 / -1 cell as (date, strategy, ticker, action), ordered so that
+    # the k-th event of each strategy on a date sits in one contiguous group:
+    # sorted by (date, k, strategy). A strategy's events of one date keep
+    # their ticker order through k, which is the order run_backtest fills them in.
+    dates, strats, tickers = np.nonzero(((positions == 1) | (positions == -1)).transpose(1, 0, 2))
+    if not len(dates):
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty, empty, np.zeros(0, dtype=positions.dtype), np.zeros(1, dtype=np.intp)
+    # rank of each event within its (date, strategy) run
+    new_run = np.ones(len(dates), dtype=bool)
+    new_run[1:] = (dates[1:] != dates[:-1]) | (strats[1:] != strats[:-1])
+    run_start = np.flatnonzero(new_run)
+    rank = np.arange(len(dates)) - np.repeat(run_start, np.diff(np.append(run_start, len(dates))))
+    order = np.lexsort((strats, rank, dates))
+    dates, strats, tickers, rank = dates[order], strats[order], tickers[order], rank[order]
+    actions = positions[strats, dates, tickers]
+    group = np.ones(len(dates), dtype=bool)
+    group[1:] = (dates[1:] != dates[:-1]) | (rank[1:] != rank[:-1])
+    bounds = np.append(np.flatnonzero(group), len(dates))
+    return dates, strats, tickers, actions, bounds
+
+def simulate_batch(prices, positions, initial_cash, transaction_cost):
+    """
+    simulate_positions for many portfolios at once.
+    prices: (dates, tickers) array shared by every portfolio, or a
+            (strategies, dates, tickers) array giving each portfolio its own
+            price path (see robustness.py)
+    positions: (strategies, dates, tickers) array of +1 / -1 / 0
+    Every portfolio follows the same rules as run_backtest and they all
+    advance together, so the price data is walked only once.
+    Returns (values (strategies, dates), cash (strategies,), holdings (strategies, tickers)).
+    """
+    n_strats, n_dates, n_tickers = positions.shape
+    per_path = prices.ndim == 3
+    cash = np.full(n_strats, float(initial_cash))
+    holdings = np.zeros((n_strats, n_tickers))
+    values = np.empty((n_strats, n_dates))
+
+    # a buy spends 20% of the cash left after the strategy's earlier fills of
+    # the day, so a strategy's fills stay sequential; what runs together is
+    # the k-th fill of every strategy on a date. The python loop is over
+    # (date, k) groups, the most fills any one strategy has on a date, not
+    # over every (date, ticker) cell some strategy trades in
+    # one group costs ~10x a scalar fill in simulate_positions (numpy call
+    # overhead), which in turn pays a bit per date and portfolio. With few
+    # portfolios trading many tickers (a handful of strategies on a big
+    # universe) the groups are barely shared, and one simulate_positions per
+    # portfolio is faster; with many (the robustness paths) this loop wins
+    fills_per_date = ((positions == 1) | (positions == -1)).sum(axis=2) # (strategies, dates)
+    n_groups = int(fills_per_date.max(axis=0).sum()) if n_strats else 0
+    if 10 * n_groups > int(fills_per_date.sum()) + n_strats * n_dates:
+        for i in range(n_strats):
+            values[i], cash[i], holdings[i] = simulate_positions(
+                prices[i] if per_path else prices, positions[i], float(initial_cash), transaction_cost)
+        return values, cash, holdings
+
+    ev_dates, ev_strats, ev_tickers, ev_actions, bounds = _batch_events(positions)
+    date_bounds = np.searchsorted(ev_dates[bounds[:-1]], np.arange(n_dates + 1))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for d in range(n_dates):
+            open_cash = cash.copy()
+            row = prices[:, d] if per_path else prices[d]
+
+            for g in range(date_bounds[d], date_bounds[d + 1]):
+                lo, hi = bounds[g], bounds[g + 1]
+                s, j = ev_strats[lo:hi], ev_tickers[lo:hi]
+                price = row[s, j] if per_path else row[j]
+                held = holdings[s, j]
+                strat_cash = cash[s]
+
+                # BUY
+                shares_to_buy = (strat_cash * 0.2) // price
+                buy = (ev_actions[lo:hi] == 1) & (strat_cash > price + transaction_cost) & (shares_to_buy > 0)
+                # SELL
+                sell = (ev_actions[lo:hi] == -1) & (held > 0)
+
+                cash[s] = strat_cash - np.where(buy, (shares_to_buy * price) + transaction_cost, 0.0) \
+                    + np.where(sell, (held * price) - transaction_cost, 0.0)
+                holdings[s, j] = np.where(buy, held + shares_to_buy, np.where(sell, 0.0, held))
+
+            if per_path:
+                values[:, d] = open_cash + np.einsum('st,st->s', holdings, row)
+            else:
+                values[:, d] = open_cash + holdings @ row
+
+    return values, cash, holdings
+
+def stack_positions(price_df, strategy_signals):
+    """
+    strategy_signals: {strategy name: {ticker: signals_dataframe}}, values can
+                      also be any compact form align_positions takes
+    Returns the (strategies, dates, tickers) int8 position tensor and the names in order.
+    """
+    names = list(strategy_signals)
+    positions = np.empty((len(names),) + price_df.shape, dtype=np.int8)
+    for i, name in enumerate(names):
+        positions[i] = align_positions(price_df, strategy_signals[name])
+    return positions, names
+
+def run_batch_backtest(price_df, positions, initial_capital, transaction_cost=5.00, names=None):
+    """
+    Backtests every strategy in one pass over price_df.
+    positions: (strategies, dates, tickers) tensor (see stack_positions), or
+               a {strategy name: signals_dict} mapping which gets stacked here
+    Returns a DataFrame of equity curves, one column per strategy. Pass
+    column=<name> to calculate_metrics to score a single strategy.
+    """
+    if isinstance(positions, dict):
+        positions, names = stack_positions(price_df, positions)
+    if names is None:
+        names = list(range(positions.shape[0]))
+
+    values, _, _ = simulate_batch(
+        price_df.to_numpy(dtype=np.float64), positions, initial_capital, transaction_cost
+    )
+    return pd.DataFrame(values.T, index=price_df.index, columns=names)
+
+def calculate_metrics(portfolio_history, initial_capital, column='Total Value', periods_per_year=252):
+    """
+    periods_per_year: bars per year used to annualize the Sharpe ratio,
+                      252 for daily bars, see resample.periods_per_year otherwise
+    """
+    final_val = portfolio_history[column].iloc[-1]
     total_return = (final_val - initial_capital) / initial_capital
     
-    daily_returns = portfolio_history['Total Value'].pct_change().dropna()
-    sharpe = np.sqrt(252) * (daily_returns.mean() / daily_returns.std())
+    daily_returns = portfolio_history[column].pct_change().dropna()
+    sharpe = np.sqrt(periods_per_year) * (daily_returns.mean() / daily_returns.std())
     
     return total_return, sharpe, final_val
\ No newline at end of file
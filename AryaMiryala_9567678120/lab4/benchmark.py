@@ -0,0 +1,320 @@
+import argparse
+import glob
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+import numpy as np
+import pandas as pd
+
+import backtester
+import crossover
+import indicators
+import profiling
+import strategies
+import sweep
+
+# offline benchmark suite for the lab4 pipeline
+# every case (a strategy, the backtest engines, calculate_metrics) runs on
+# synthetic GBM prices for each universe size x history length: once under
+# tracemalloc for its peak memory (numpy buffers are traced too, tensorflow's
+# own allocator is not), then timed. imports of the heavy libraries are done
+# before either; the indicator cache is emptied before every run, so each one
+# computes its indicators instead of reading the previous run's. results go to
+# data/benchmarks as JSON
+# and can be compared against an earlier file to flag regressions:
+#
+#   python benchmark.py                                  full grid
+#   python benchmark.py --sizes 10 100 --lengths 252     quick run
+#   python benchmark.py --baseline latest --fail-on-regression
+#
+# ARIMA and LSTM fit one model per ticker, so they only run on the first
+# --model-tickers tickers of each universe; compare them on seconds_per_ticker
+# backtest_batch / backtest_sequential run the same BATCH_WINDOWS crossovers
+# through simulate_batch and through one simulate_positions each; their setup
+# checks that both give the same equity curves, so every benchmark run is also
+# an equivalence test of the batch engine
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'benchmarks')
+
+SIZES = (10, 100, 1000, 5000)
+LENGTHS = (252, 1260)
+
+INITIAL_CAPITAL = 100000.0
+TRANS_COST = 5.0
+
+def synthetic_prices(n_tickers, n_dates, seed=0, start='2015-01-02'):
+    """
+    (dates, tickers) geometric Brownian motion closes on business days,
+    each ticker with its own drift (-10%..30%) and volatility (15%..60%) a year.
+    """
+    rng = np.random.default_rng(seed)
+    mu = rng.uniform(-0.10, 0.30, n_tickers)
+    sigma = rng.uniform(0.15, 0.60, n_tickers)
+    dt = 1 / 252
+    log_ret = (mu - 0.5 * sigma ** 2) * dt + sigma * np.sqrt(dt) * rng.standard_normal((n_dates - 1, n_tickers))
+    start_price = rng.uniform(20, 500, n_tickers)
+    values = np.empty((n_dates, n_tickers))
+    values[0] = start_price
+    values[1:] = start_price * np.exp(np.cumsum(log_ret, axis=0))
+    index = pd.bdate_range(start, periods=n_dates, name='Date')
+    return pd.DataFrame(values, index=index, columns=[f'T{i:04d}' for i in range(n_tickers)])
+
+class Case:
+    def __init__(self, name, setup, repeat=3, model_fit=False, max_cells=None, requires=()):
+        """
+        setup: function(prices_df, options) -> zero-argument callable doing the timed work
+        repeat: timed runs (the fastest and the median are kept)
+        model_fit: fits a model per ticker, only the first options['model_tickers'] are used
+        max_cells: skip universes with more dates x tickers than this
+        requires: modules imported up front (outside the timing), the case is skipped without them
+        """
+        self.name = name
+        self.setup = setup
+        self.repeat = repeat
+        self.model_fit = model_fit
+        self.max_cells = max_cells
+        self.requires = requires
+
+def _per_ticker(fn, **params):
+    def setup(prices_df, options):
+        columns = [prices_df[t] for t in prices_df.columns]
+        return lambda: [fn(prices, **params) for prices in columns]
+    return setup
+
+def _lstm(prices_df, options):
+    columns = [prices_df[t] for t in prices_df.columns]
+    return lambda: [strategies.run_lstm_strategy(prices, epochs=options['lstm_epochs']) for prices in columns]
+
+def _backtest(engine):
+    def setup(prices_df, options):
+        signals = strategies.generate_events(prices_df)
+        return lambda: backtester.Portfolio(INITIAL_CAPITAL, TRANS_COST).run_backtest(prices_df, signals, engine=engine)
+    return setup
+
+BATCH_WINDOWS = ((5, 20), (10, 30), (10, 50), (15, 60), (20, 50), (20, 100), (30, 90), (40, 120), (50, 150), (50, 200))
+
+def _batch_positions(values):
+    # one SMA crossover per (short, long) pair, as a (strategies, dates, tickers) tensor
+    positions = np.empty((len(BATCH_WINDOWS),) + values.shape, dtype=np.int8)
+    for i, (short, long) in enumerate(BATCH_WINDOWS):
+        short_mavg, long_mavg = sweep.rolling_means(values, [short, long], min_periods=1)
+        signal = short_mavg > long_mavg
+        signal[:short] = False
+        positions[i] = crossover.regime_changes(signal, axis=0)
+    return positions
+
+def _backtest_batch(sequential):
+    def setup(prices_df, options):
+        prices = prices_df.to_numpy(dtype=np.float64)
+        positions = _batch_positions(prices)
+
+        def batch():
+            return backtester.simulate_batch(prices, positions, INITIAL_CAPITAL, TRANS_COST)
+
+        def one_by_one():
+            return [backtester.simulate_positions(prices, p, INITIAL_CAPITAL, TRANS_COST) for p in positions]
+
+        values, cash, _ = batch()
+        runs = one_by_one()
+        # only the daily valuation may differ, in the last bits (matrix vs vector product)
+        if not (np.array_equal(cash, [r[1] for r in runs])
+                and np.allclose(values, [r[0] for r in runs], rtol=1e-12, atol=0)):
+            raise AssertionError("simulate_batch does not match simulate_positions run once per strategy")
+        return one_by_one if sequential else batch
+    return setup
+
+def _metrics(prices_df, options):
+    history = backtester.Portfolio(INITIAL_CAPITAL, TRANS_COST).run_backtest(
+        prices_df, strategies.generate_events(prices_df), engine='array')
+    return lambda: backtester.calculate_metrics(history, INITIAL_CAPITAL)
+
+CASES = {
+    'sma_signals': Case('sma_signals', _per_ticker(strategies.generate_sma_signals)),
+    'hybrid_signals': Case('hybrid_signals', _per_ticker(strategies.generate_hybrid_signals)),
+    'arima_signals': Case('arima_signals', _per_ticker(strategies.generate_arima_signals), repeat=1,
+                          model_fit=True, requires=('statsmodels.tsa.arima.model',)),
+    'lstm_strategy': Case('lstm_strategy', _lstm, repeat=1, model_fit=True,
+                          requires=('tensorflow', 'sklearn.preprocessing')),
+    'backtest_array': Case('backtest_array', _backtest('array')),
+    # the .loc loop takes ~10us per cell, past a few hundred thousand cells it only burns time
+    'backtest_loop': Case('backtest_loop', _backtest('loop'), repeat=1, max_cells=300_000),
+    'backtest_batch': Case('backtest_batch', _backtest_batch(sequential=False)),
+    'backtest_sequential': Case('backtest_sequential', _backtest_batch(sequential=True)),
+    'calculate_metrics': Case('calculate_metrics', _metrics, repeat=5),
+}
+
+def _measure(fn, repeat):
+    # memory run first (it doubles as the warm-up), tracemalloc slows allocations down
+    indicators.CACHE.clear()
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    times = []
+    for _ in range(repeat):
+        indicators.CACHE.clear() # cold indicators, as in a fresh process
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times, peak
+
+def run_case(case, prices_df, options):
+    """One result dict for a case on one universe (skipped cases carry a 'skipped' reason)."""
+    n_dates, n_tickers = prices_df.shape
+    result = {'case': case.name, 'n_tickers': n_tickers, 'n_dates': n_dates}
+    if case.max_cells is not None and n_dates * n_tickers > case.max_cells:
+        return {**result, 'skipped': f"more than {case.max_cells:,} cells"}
+    try:
+        for module in case.requires:
+            importlib.import_module(module)
+    except ImportError as e:
+        return {**result, 'skipped': f"missing {e.name}"}
+    if case.model_fit:
+        prices_df = prices_df.iloc[:, :options['model_tickers']]
+
+    fn = case.setup(prices_df, options)
+    times, peak = _measure(fn, case.repeat)
+    seconds = min(times)
+    return {
+        **result,
+        'tickers_run': prices_df.shape[1],
+        'repeat': case.repeat,
+        'seconds': seconds,
+        'seconds_median': float(np.median(times)),
+        'seconds_per_ticker': seconds / prices_df.shape[1],
+        'peak_mb': peak / 2**20,
+    }
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def run_suite(cases=None, sizes=SIZES, lengths=LENGTHS, model_tickers=2, lstm_epochs=1, seed=0, verbose=True):
+    """
+    Runs every case on every (size, length) universe.
+    Returns {'meta': {...}, 'results': [one dict per case and universe]}.
+    """
+    cases = list(CASES) if cases is None else cases
+    options = {'model_tickers': model_tickers, 'lstm_epochs': lstm_epochs}
+    results = []
+    for n_dates in lengths:
+        for n_tickers in sizes:
+            prices_df = synthetic_prices(n_tickers, n_dates, seed)
+            for name in cases:
+                result = run_case(CASES[name], prices_df, options)
+                results.append(result)
+                if verbose:
+                    print(_format_row(result), flush=True)
+    meta = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'max_rss_mb': profiling.max_rss_mb(),
+        'seed': seed,
+        'options': options,
+    }
+    return {'meta': meta, 'results': results}
+
+def _key(result):
+    return result['case'], result['n_tickers'], result['n_dates']
+
+def compare(current, baseline, tolerance=0.25, min_seconds=0.005, min_mb=1.0):
+    """
+    Matches results on (case, n_tickers, n_dates) and flags regressions: more
+    than `tolerance` slower (or more peak memory) than the baseline, ignoring
+    differences under min_seconds / min_mb, which are mostly noise.
+    Returns a DataFrame with one row per matched result.
+    """
+    base = {_key(r): r for r in baseline['results'] if 'seconds' in r}
+    rows = []
+    for r in current['results']:
+        b = base.get(_key(r))
+        if b is None or 'seconds' not in r:
+            continue
+        slower = r['seconds'] > b['seconds'] * (1 + tolerance) and r['seconds'] - b['seconds'] > min_seconds
+        bigger = r['peak_mb'] > b['peak_mb'] * (1 + tolerance) and r['peak_mb'] - b['peak_mb'] > min_mb
+        rows.append({
+            'case': r['case'], 'n_tickers': r['n_tickers'], 'n_dates': r['n_dates'],
+            'seconds': r['seconds'], 'base_seconds': b['seconds'], 'time_ratio': r['seconds'] / b['seconds'],
+            'peak_mb': r['peak_mb'], 'base_peak_mb': b['peak_mb'],
+            'regression': ', '.join(k for k, flag in (('time', slower), ('memory', bigger)) if flag),
+        })
+    return pd.DataFrame(rows)
+
+def save(report, path=None):
+    """Writes the report as JSON (default data/benchmarks/bench-<time>.json) and returns the path."""
+    if path is None:
+        os.makedirs(BENCH_DIR, exist_ok=True)
+        path = os.path.join(BENCH_DIR, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=1)
+    return path
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+def latest(exclude=None):
+    """Newest saved report in data/benchmarks (None if there is none)."""
+    paths = sorted(p for p in glob.glob(os.path.join(BENCH_DIR, 'bench-*.json')) if p != exclude)
+    return paths[-1] if paths else None
+
+def _format_row(r):
+    head = f"{r['case']:<18} {r['n_tickers']:>5} x {r['n_dates']:>5}"
+    if 'skipped' in r:
+        return f"{head}  skipped: {r['skipped']}"
+    return f"{head}  {r['seconds']:9.4f}s  {r['seconds_per_ticker'] * 1e3:9.3f} ms/ticker  {r['peak_mb']:8.1f} MB"
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the lab4 pipeline on synthetic GBM prices")
+    parser.add_argument('--cases', nargs='+', default=list(CASES), choices=list(CASES))
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(SIZES), help="universe sizes (tickers)")
+    parser.add_argument('--lengths', nargs='+', type=int, default=list(LENGTHS), help="history lengths (bars)")
+    parser.add_argument('--model-tickers', type=int, default=2, help="tickers per universe for ARIMA / LSTM")
+    parser.add_argument('--lstm-epochs', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=None, help="JSON output path (default data/benchmarks/bench-<time>.json)")
+    parser.add_argument('--baseline', default=None, help="earlier report to compare with, or 'latest'")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown before flagging (0.25 = 25%%)")
+    parser.add_argument('--fail-on-regression', action='store_true', help="exit with status 1 on any regression")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    warnings.filterwarnings('ignore', category=UserWarning, module='keras')
+    baseline_path = latest() if args.baseline == 'latest' else args.baseline
+
+    report = run_suite(args.cases, args.sizes, args.lengths, args.model_tickers, args.lstm_epochs, args.seed)
+    path = save(report, args.out)
+    print(f"\nsaved {path}")
+
+    if baseline_path is None:
+        return 0
+    table = compare(report, load(baseline_path), args.tolerance)
+    print(f"\ncompared with {baseline_path}")
+    if table.empty:
+        print("no matching results")
+        return 0
+    print(table.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    regressions = table[table['regression'] != '']
+    print(f"\n{len(regressions)} regression(s)")
+    return 1 if args.fail_on_regression and len(regressions) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import numpy as np
+
+# vectorized buy / sell event detection for the lab4 strategies (legacy/signal.py
+# keeps its own copy of the crossover rule, the legacy scripts run standalone)
+# everything works on 1-D series or on 2-D (dates, tickers) matrices in one
+# pass; time runs along `axis` (0 by default) and events come back as int8:
+# 1 = buy, -1 = sell, 0 = nothing
+
+def _shift(x, axis):
+    # previous bar along axis, NaN on the first bar so it never counts as a cross
+    prev = np.roll(np.asarray(x, dtype=np.float64), 1, axis=axis)
+    index = [slice(None)] * prev.ndim
+    index[axis] = 0
+    prev[tuple(index)] = np.nan
+    return prev
+
+def crossover_events(fast, slow, axis=0):
+    """
+    Buy where fast crosses above slow, sell where it crosses below:
+      buy:  fast > slow  and previous fast <= previous slow
+      sell: fast < slow  and previous fast >= previous slow
+    Comparisons with NaN are False, so warm-up bars never trigger.
+    slow can be anything that broadcasts against fast (e.g. a constant level).
+    """
+    fast = np.asarray(fast, dtype=np.float64)
+    slow = np.broadcast_to(np.asarray(slow, dtype=np.float64), fast.shape)
+    prev_fast, prev_slow = _shift(fast, axis), _shift(slow, axis)
+
+    events = np.zeros(fast.shape, dtype=np.int8)
+    events[(fast > slow) & (prev_fast <= prev_slow)] = 1
+    events[(fast < slow) & (prev_fast >= prev_slow)] = -1
+    return events
+
+def threshold_events(x, level, axis=0):
+    """Buy when x crosses above `level`, sell when it crosses back below."""
+    return crossover_events(x, level, axis)
+
+def regime_changes(state, axis=0):
+    """
+    Events from a 0/1 in-the-market state, i.e. state.diff() as the lab4
+    strategies compute 'positions', with 0 on the first bar instead of NaN.
+    """
+    state = np.asarray(state)
+    events = np.zeros(state.shape, dtype=np.int8)
+    index = [slice(None)] * state.ndim
+    index[axis] = slice(1, None)
+    events[tuple(index)] = np.diff(state.astype(np.int8), axis=axis)
+    return events
@@ -1,13 +1,57 @@
-import yfinance as yf
+import hashlib
 import pandas as pd
+import numpy as np
 
-def fetch_data(tickers, start_date, end_date):
+# yfinance only serves intraday bars in short windows per request
+MAX_REQUEST_DAYS = {'1m': 7, '2m': 59, '5m': 59, '15m': 59, '30m': 59, '60m': 59, '90m': 59, '1h': 59}
+
+def fetch_data(tickers, start_date, end_date, store=None, offline=False, interval="1d"):
     """
-    Fetches daily Close prices for a list of tickers.
+    Fetches Close prices (daily by default) for a list of tickers.
     Returns a DataFrame where columns are ticker names.
+    store: optional price_store.PriceStore. Only date ranges the store has not
+           seen yet are downloaded, everything else is read from local files.
+    offline: never touch the network, serve whatever the store has.
+    interval: yfinance bar size, e.g. "1d" or "1m" (intraday timestamps are UTC)
     """
+    if store is None:
+        if offline:
+            raise ValueError("offline mode needs a price store")
+        return _download_close(tickers, start_date, end_date, interval)
+    if store.interval != interval:
+        raise ValueError(f"store holds {store.interval} bars, asked for {interval}")
+
+    # group tickers by the exact gap they are missing, one download per gap
+    gaps = {}
+    for ticker in tickers:
+        for gap in store.missing_ranges(ticker, start_date, end_date):
+            gaps.setdefault(gap, []).append(ticker)
+
+    if gaps and offline:
+        print(f"Offline mode: {sum(len(t) for t in gaps.values())} missing ranges not downloaded")
+    elif gaps:
+        for (gap_start, gap_end), gap_tickers in gaps.items():
+            for start, end in _split_gap(pd.Timestamp(gap_start), pd.Timestamp(gap_end), interval):
+                data = _download_close(gap_tickers, start, end, interval)
+                for ticker in gap_tickers:
+                    close = data[ticker] if ticker in data else pd.Series(dtype=float)
+                    store.write(ticker, close, start, end)
+
+    return store.load_frame(tickers, start_date, end_date)
+
+def _split_gap(start, end, interval):
+    step = MAX_REQUEST_DAYS.get(interval)
+    if step is None:
+        return [(start, end)]
+    edges = list(pd.date_range(start, end, freq=f'{step}D')) + [end]
+    return [(a, b) for a, b in zip(edges[:-1], edges[1:]) if a < b]
+
+def _download_close(tickers, start_date, end_date, interval="1d"):
+    # imported here, yfinance is slow to load and offline runs never need it
+    import yfinance as yf
+
     print(f"Downloading data for: {tickers}...")
-    data = yf.download(tickers, start=start_date, end=end_date, interval="1d")
+    data = yf.download(tickers, start=start_date, end=end_date, interval=interval)
     
     
     if isinstance(data.columns, pd.MultiIndex):
@@ -16,4 +60,16 @@ def fetch_data(tickers, start_date, end_date):
        
         df = data[['Close']].copy()
         df.columns = tickers
-        return df
\ No newline at end of file
+        return df
+
+def fingerprint(prices):
+    """
+    Short content hash of a price Series / DataFrame (values and dates).
+    Used as a cache key so results are only reused for identical data.
+    """
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(prices.to_numpy(dtype=np.float64)).tobytes())
+    h.update(np.asarray(prices.index.astype('int64')).tobytes())
+    if isinstance(prices, pd.DataFrame):
+        h.update(','.join(map(str, prices.columns)).encode())
+    return h.hexdigest()[:16]
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+# compact signal format for the backtester
+# the strategies return a float64 frame (price, averages, rsi, signal,
+# positions) per ticker, but run_backtest only reads the +1 / -1 entries of
+# 'positions'. SignalEvents keeps just those: an int32 offset into a shared
+# date index and an int8 action per event, grouped by ticker (CSR layout,
+# ticker j owns events ptr[j]:ptr[j + 1]). to_dense() gives the (dates,
+# tickers) int8 matrix the array engines work on.
+
+class SignalEvents:
+    def __init__(self, dates, tickers, offsets, actions, ptr):
+        """
+        dates: DatetimeIndex the offsets point into
+        tickers: list of tickers, in column order
+        offsets: int32 row of every event in dates, sorted within each ticker
+        actions: int8 +1 (buy) / -1 (sell), same length as offsets
+        ptr: int64 of length len(tickers) + 1, ticker j's events are offsets[ptr[j]:ptr[j + 1]]
+        """
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = list(tickers)
+        self.offsets = np.asarray(offsets, dtype=np.int32)
+        self.actions = np.asarray(actions, dtype=np.int8)
+        self.ptr = np.asarray(ptr, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.actions)
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + self.actions.nbytes + self.ptr.nbytes
+
+    @classmethod
+    def from_dense(cls, positions, dates, tickers):
+        """From a (dates, tickers) positions matrix, only exact +1 / -1 are kept."""
+        positions = np.asarray(positions)
+        # transpose so nonzero() comes back grouped by ticker
+        cols, rows = np.nonzero((positions.T == 1) | (positions.T == -1))
+        ptr = np.searchsorted(cols, np.arange(len(tickers) + 1))
+        return cls(dates, tickers, rows, positions[rows, cols], ptr)
+
+    @classmethod
+    def from_signals(cls, signals_dict, dates):
+        """From {ticker: signals_dataframe} (the strategies' output) on a shared date index."""
+        dates = pd.DatetimeIndex(dates)
+        offsets, actions, ptr = [], [], [0]
+        for ticker in signals_dict:
+            pos = signals_dict[ticker]['positions']
+            pos = pos[(pos == 1.0) | (pos == -1.0)]
+            rows = dates.get_indexer(pos.index)
+            keep = rows >= 0 # events on dates outside `dates` are never traded
+            offsets.append(rows[keep])
+            actions.append(pos.to_numpy()[keep])
+            ptr.append(ptr[-1] + int(keep.sum()))
+        if not offsets:
+            return cls(dates, [], [], [], ptr)
+        return cls(dates, list(signals_dict), np.concatenate(offsets), np.concatenate(actions), ptr)
+
+    @classmethod
+    def concat(cls, parts):
+        """Joins SignalEvents of different tickers on the same dates, tickers in order of parts."""
+        dates = parts[0].dates
+        if any(not p.dates.equals(dates) for p in parts[1:]):
+            raise ValueError("SignalEvents to join are on different dates")
+        ptr, base = [np.zeros(1, dtype=np.int64)], 0
+        for p in parts:
+            ptr.append(p.ptr[1:] + base)
+            base += p.ptr[-1]
+        return cls(dates, [t for p in parts for t in p.tickers], np.concatenate([p.offsets for p in parts]),
+                   np.concatenate([p.actions for p in parts]), np.concatenate(ptr))
+
+    def ticker(self, ticker):
+        """(event dates, actions) for one ticker."""
+        j = self.tickers.index(ticker)
+        lo, hi = self.ptr[j], self.ptr[j + 1]
+        return self.dates[self.offsets[lo:hi]], self.actions[lo:hi]
+
+    def to_dense(self, dates=None, tickers=None):
+        """
+        (dates, tickers) int8 matrix, 0 where nothing happens.
+        dates / tickers default to the ones stored; other ones reindex (dates
+        missing from the stored index get no events, unknown tickers stay 0).
+        """
+        dates = self.dates if dates is None else pd.DatetimeIndex(dates)
+        tickers = self.tickers if tickers is None else list(tickers)
+        dense = np.zeros((len(dates), len(tickers)), dtype=np.int8)
+
+        rows = self.offsets
+        if not dates.equals(self.dates):
+            rows = dates.get_indexer(self.dates[self.offsets])
+        cols_of = {t: j for j, t in enumerate(tickers)}
+        for j, ticker in enumerate(self.tickers):
+            if ticker not in cols_of:
+                continue
+            lo, hi = self.ptr[j], self.ptr[j + 1]
+            r = rows[lo:hi]
+            keep = r >= 0
+            dense[r[keep], cols_of[ticker]] = self.actions[lo:hi][keep]
+        return dense
@@ -0,0 +1,201 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+import backtester
+import data_loader
+import ledger
+import streaming
+
+# incremental daily update mode
+# a Book is one strategy run on a fixed universe that is carried forward bar by
+# bar instead of being recomputed: the first run replays the whole history
+# through the streaming strategies (streaming.py), later runs load the saved
+# state and only apply the bars after the last one seen, so a daily refresh
+# costs O(new bars x tickers) no matter how long the history is.
+#
+#   data/incremental/<strategy>-<key>/state.json       indicator / model state per ticker,
+#                                                      cash, holdings, last date
+#                                    /segment-00000.npz  ledger rows of the first run
+#                                    /segment-00001.npz  ... and of every update after it
+#
+# models are frozen between full runs: ARIMA keeps the params fitted on the
+# first run's history, LSTM the weights trained then (both stay in their usual
+# caches). Delete the book's folder (Book.reset) to refit on the full history.
+# the streaming ARIMA has no signal for the first p + d bars of the history,
+# where statsmodels' diffuse start still trades, so its first-run equity can
+# differ from the batch backtest; SMA, Hybrid and LSTM replay it exactly.
+
+STATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'incremental')
+
+# main.py strategy name -> streaming.STREAMING_STRATEGIES name
+STREAMING_NAMES = {'SMA': 'sma', 'Hybrid': 'hybrid', 'ARIMA': 'arima', 'LSTM': 'lstm'}
+
+def _stream_params(kind, params):
+    # constructor args of the streaming class; the rest only matter for the first fit
+    if kind == 'arima':
+        return {'order': tuple(params.get('order', (5,1,0)))}
+    if kind == 'lstm':
+        return {'lookback': params.get('lookback', 60)}
+    return dict(params)
+
+def _initial_states(kind, prices_df, params, n_jobs=None):
+    # fits the models a streaming strategy needs, {} when it only has indicators
+    if kind == 'arima':
+        import arima_batch
+        order = tuple(params.get('order', (5,1,0)))
+        fitted = arima_batch.fit_arima_batch(prices_df, order, n_jobs=n_jobs)
+        return {t: streaming.StreamingARIMA(fitted[t], order) for t in prices_df.columns}
+    if kind == 'lstm':
+        import model_store
+        import strategies
+        store = model_store.LSTMModelStore()
+        lookback, epochs = params.get('lookback', 60), params.get('epochs', 5)
+        states = {}
+        for ticker in prices_df.columns:
+            prices = prices_df[ticker].dropna()
+            # trains (or reuses) the model and its frozen numpy copy in the model store
+            strategies.run_lstm_strategy(prices, lookback, epochs, store=store)
+            status, entry = store.lookup(ticker, prices, lookback, epochs, strategies.LSTM_ARCH)
+            states[ticker] = streaming.StreamingLSTM(entry['frozen'] if entry else None, lookback)
+        return states
+    return {}
+
+class Book:
+    def __init__(self, strategy, tickers, initial_capital=100000.0, transaction_cost=5.00,
+                 params=None, start=None, interval='1d', root=STATE_DIR):
+        """
+        strategy: 'SMA', 'Hybrid', 'ARIMA' or 'LSTM'
+        params: strategy params, e.g. short_window / order / lookback and epochs
+        start / interval: first date and bar size of the history, part of the book's key
+        """
+        if strategy not in STREAMING_NAMES:
+            raise KeyError(f"No incremental mode for {strategy} (available: {', '.join(STREAMING_NAMES)})")
+        self.strategy = strategy
+        self.kind = STREAMING_NAMES[strategy]
+        self.tickers = list(tickers)
+        self.initial_capital = initial_capital
+        self.transaction_cost = transaction_cost
+        self.params = dict(params or {})
+        text = json.dumps([strategy, self.tickers, self.params, initial_capital, transaction_cost,
+                           str(start), interval], sort_keys=True, default=str)
+        self.folder = os.path.join(root, f"{strategy}-{hashlib.sha1(text.encode()).hexdigest()[:12]}")
+        self._state = None
+
+    def exists(self):
+        return os.path.exists(os.path.join(self.folder, 'state.json'))
+
+    def state(self):
+        """The saved state dict (None before the first run)."""
+        if self._state is None and self.exists():
+            with open(os.path.join(self.folder, 'state.json')) as f:
+                self._state = json.load(f)
+        return self._state
+
+    @property
+    def last_date(self):
+        """Date of the last bar applied (None before the first run)."""
+        state = self.state()
+        return None if state is None else pd.Timestamp(state['last_date'])
+
+    def update(self, prices_df, n_jobs=None):
+        """
+        Applies the bars of prices_df after last_date and saves the new state;
+        the first call fits the models and replays all of prices_df.
+        n_jobs: processes for the first ARIMA fit
+        Returns the number of bars applied.
+        """
+        prices_df = prices_df[self.tickers]
+        state = self.state()
+        make = streaming.STREAMING_STRATEGIES[self.kind]
+        stream_params = _stream_params(self.kind, self.params)
+        portfolio = backtester.Portfolio(self.initial_capital, self.transaction_cost)
+
+        if state is None:
+            states = _initial_states(self.kind, prices_df, self.params, n_jobs)
+            segments = []
+        else:
+            prices_df = prices_df[prices_df.index > self.last_date]
+            portfolio.cash = state['cash']
+            portfolio.holdings = dict(state['holdings'])
+            states = {}
+            for ticker, saved in state['states'].items():
+                states[ticker] = make(**stream_params)
+                states[ticker].load_state(saved)
+            segments = state['segments']
+        if prices_df.empty:
+            return 0
+
+        # fixed column order, so the segments line up
+        portfolio.ledger = ledger.Ledger(self.tickers, capacity=len(prices_df))
+        streaming.run_stream(streaming.frame_bars(prices_df), portfolio, make, states=states, **stream_params)
+
+        os.makedirs(self.folder, exist_ok=True)
+        segment = f"segment-{len(segments):05d}.npz"
+        book = portfolio.ledger
+        np.savez(os.path.join(self.folder, segment), equity=book.equity[:book.n_bars],
+                 holdings=book.holdings[:book.n_bars], fills=book.fills[:book.n_fills])
+
+        # state last and atomically, a crash before this leaves the previous state in place
+        self._state = {
+            'strategy': self.strategy, 'tickers': self.tickers, 'params': self.params,
+            'last_date': str(prices_df.index[-1]),
+            'cash': portfolio.cash, 'holdings': portfolio.holdings,
+            'segments': segments + [segment],
+            'states': {ticker: s.state() for ticker, s in states.items()},
+        }
+        tmp = os.path.join(self.folder, 'state.tmp.json')
+        with open(tmp, 'w') as f:
+            json.dump(self._state, f, default=float)
+        os.replace(tmp, os.path.join(self.folder, 'state.json'))
+        return len(prices_df)
+
+    def load_ledger(self):
+        """The whole run so far as one ledger.Ledger (all segments joined)."""
+        book = ledger.Ledger(self.tickers)
+        state = self.state()
+        if state is None:
+            return book
+        parts = [np.load(os.path.join(self.folder, name)) for name in state['segments']]
+        book.equity = np.concatenate([p['equity'] for p in parts])
+        book.holdings = np.concatenate([p['holdings'] for p in parts])
+        book.fills = np.concatenate([p['fills'] for p in parts])
+        book.n_bars, book.n_fills = len(book.equity), len(book.fills)
+        return book
+
+    def equity(self):
+        """Total value of every bar so far, named after the strategy."""
+        return self.load_ledger().equity_frame()['Total Value'].rename(self.strategy)
+
+    def reset(self):
+        """Deletes the saved state, the next update starts over from the full history."""
+        if os.path.isdir(self.folder):
+            for name in os.listdir(self.folder):
+                os.remove(os.path.join(self.folder, name))
+            os.rmdir(self.folder)
+        self._state = None
+
+def daily_update(strategy_names, tickers, start_date, end_date, initial_capital, transaction_cost,
+                 store, offline=False, interval='1d', strategy_params=None, n_jobs=None, reset=False):
+    """
+    Brings one Book per strategy up to end_date. Books that exist only read
+    (and download) prices after their last bar, new ones load the full
+    [start_date, end_date) history once.
+    reset: start every book over from the full history (refits the models)
+    Returns {strategy: Book}.
+    """
+    strategy_params = strategy_params or {}
+    books = {}
+    for name in strategy_names:
+        book = Book(name, tickers, initial_capital, transaction_cost,
+                    strategy_params.get(name), start_date, interval)
+        if reset:
+            book.reset()
+        since = book.last_date if book.exists() else start_date
+        prices_df = data_loader.fetch_data(tickers, since, end_date, store=store, offline=offline, interval=interval)
+        n_bars = book.update(prices_df, n_jobs)
+        print(f"{name}: {n_bars} new bar(s), up to {book.last_date}")
+        books[name] = book
+    return books
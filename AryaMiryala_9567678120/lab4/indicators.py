@@ -0,0 +1,107 @@
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# shared, memoized indicators for every strategy
+# results are keyed by (series fingerprint, indicator, params), so the same
+# rolling mean asked for by the SMA, hybrid and LSTM strategies is computed
+# once per series; old entries are evicted LRU once the cache holds more than
+# max_bytes
+# the fingerprint is a sha1 of the raw value and index buffers, hashed in
+# place (no float / int64 conversion copies like data_loader.fingerprint): a
+# lookup costs about a quarter of one pandas rolling mean, equal data hits
+# however it was built, and data edited in place misses
+# cached Series are shared between callers, treat them as read-only
+
+def _fingerprint(series):
+    h = hashlib.sha1()
+    values = series.to_numpy()
+    h.update(values.dtype.str.encode())
+    h.update(np.ascontiguousarray(values))
+    index = series.index
+    if isinstance(index, pd.RangeIndex):
+        h.update(repr((index.start, index.stop, index.step)).encode())
+    elif isinstance(index, pd.DatetimeIndex):
+        # asi8 is the int64 view of the dates, tz-aware ones included
+        h.update(str(index.tz).encode())
+        h.update(np.ascontiguousarray(index.asi8))
+    elif index.dtype.kind in 'biufcmM':
+        h.update(index.dtype.str.encode())
+        h.update(np.ascontiguousarray(index.to_numpy()))
+    else:
+        h.update(pd.util.hash_array(index.to_numpy()))
+    return h.digest()
+
+class IndicatorCache:
+    def __init__(self, max_bytes=512 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, series, name, params, compute):
+        key = (_fingerprint(series), name, params)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+        self.misses += 1
+        value = compute()
+        self.entries[key] = value
+        self.nbytes += value.memory_usage(index=False)
+        while self.nbytes > self.max_bytes and len(self.entries) > 1:
+            _, old = self.entries.popitem(last=False)
+            self.nbytes -= old.memory_usage(index=False)
+        return value
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        return {'entries': len(self.entries), 'bytes': self.nbytes, 'hits': self.hits, 'misses': self.misses}
+
+CACHE = IndicatorCache()
+
+def rolling_mean(prices, window, min_periods=None):
+    """
+    prices.rolling(window, min_periods=min_periods).mean(), memoized.
+    For gap-free series only the min_periods=1 version is computed; the
+    stricter ones are the same values with the leading warm-up bars blanked out.
+    """
+    prices = pd.Series(prices)
+    min_periods = window if min_periods is None else min_periods
+
+    def base():
+        return CACHE.get(prices, 'rolling_mean', (window, 1),
+                         lambda: prices.rolling(window=window, min_periods=1).mean())
+    if min_periods <= 1:
+        return base()
+
+    def compute():
+        if prices.isna().any():
+            # gaps change which windows are complete, no shortcut here
+            return prices.rolling(window=window, min_periods=min_periods).mean()
+        masked = base().copy()
+        masked.iloc[:min_periods - 1] = np.nan
+        return masked
+    # the blanked version is cached too, so repeat calls skip the NaN check and the copy
+    return CACHE.get(prices, 'rolling_mean', (window, min_periods), compute)
+
+def rsi(prices, period=14):
+    """RSI as in generate_hybrid_signals, memoized."""
+    prices = pd.Series(prices)
+
+    def compute():
+        delta = prices.diff()
+        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+        rs = gain / loss
+        return 100 - (100 / (1 + rs))
+
+    return CACHE.get(prices, 'rsi', (period,), compute)
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+# columnar record of a backtest
+# instead of a dict per bar, every bar's date / cash / total value goes into a
+# preallocated structured array and the shares held into a (bars, tickers)
+# matrix; every executed trade goes into a fill log. Arrays grow by doubling,
+# so a long run does a handful of allocations instead of one per bar.
+# the *_frame() exports wrap the arrays without copying them (treat the
+# frames as read-only views), to_parquet() writes them out.
+
+EQUITY_DTYPE = np.dtype([('date', 'i8'), ('cash', 'f8'), ('value', 'f8')])
+FILL_DTYPE = np.dtype([
+    ('date', 'i8'), ('ticker', 'i4'), ('side', 'i1'),
+    ('shares', 'f8'), ('price', 'f8'), ('fee', 'f8'),
+])
+
+BUY, SELL = 1, -1
+
+def _ns(date):
+    # int64 ns since epoch (UTC for tz-aware timestamps)
+    return pd.Timestamp(date).value
+
+def _grow(array, needed):
+    size = max(needed, 2 * len(array), 16)
+    grown = np.zeros((size,) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+def fills_to_frame(fills, tickers):
+    """DataFrame view of a FILL_DTYPE array, ticker codes mapped onto `tickers`."""
+    return pd.DataFrame({
+        'date': fills['date'].view('datetime64[ns]'),
+        'ticker': pd.Categorical.from_codes(fills['ticker'], categories=tickers),
+        'side': fills['side'],
+        'shares': fills['shares'],
+        'price': fills['price'],
+        'fee': fills['fee'],
+    }, copy=False)
+
+class Ledger:
+    def __init__(self, tickers=(), capacity=0, fill_capacity=0):
+        """
+        tickers: known tickers up front (more are added as they show up)
+        capacity / fill_capacity: bars / fills to preallocate room for
+        """
+        self.tickers = []
+        self._col = {}
+        self.equity = np.zeros(capacity, dtype=EQUITY_DTYPE)
+        self.holdings = np.zeros((capacity, 0))
+        self.fills = np.zeros(fill_capacity, dtype=FILL_DTYPE)
+        self.n_bars = 0
+        self.n_fills = 0
+        for ticker in tickers:
+            self.column(ticker)
+
+    def column(self, ticker):
+        """Holdings column of a ticker, adding one if it is new."""
+        j = self._col.get(ticker)
+        if j is None:
+            j = self._col[ticker] = len(self.tickers)
+            self.tickers.append(ticker)
+            self.holdings = np.hstack((self.holdings, np.zeros((len(self.holdings), 1))))
+        return j
+
+    def reserve(self, n_bars, n_fills=0):
+        """Makes room for n_bars more bars and n_fills more fills."""
+        if self.n_bars + n_bars > len(self.equity):
+            self.equity = _grow(self.equity, self.n_bars + n_bars)
+            self.holdings = _grow(self.holdings, self.n_bars + n_bars)
+        if self.n_fills + n_fills > len(self.fills):
+            self.fills = _grow(self.fills, self.n_fills + n_fills)
+
+    def record_bar(self, date, cash, value, holdings):
+        """
+        holdings: {ticker: shares} or an array in self.tickers order
+        """
+        self.reserve(1)
+        i = self.n_bars
+        self.equity[i] = (_ns(date), cash, value)
+        if isinstance(holdings, dict):
+            for ticker, shares in holdings.items():
+                j = self.column(ticker) # may widen self.holdings, look it up after
+                self.holdings[i, j] = shares
+        else:
+            self.holdings[i] = holdings
+        self.n_bars += 1
+
+    def record_fill(self, date, ticker, side, shares, price, fee):
+        """side: ledger.BUY or ledger.SELL"""
+        self.reserve(0, 1)
+        self.fills[self.n_fills] = (_ns(date), self.column(ticker), side, shares, price, fee)
+        self.n_fills += 1
+
+    def equity_frame(self):
+        """Date-indexed 'Cash' and 'Total Value' of every recorded bar."""
+        bars = self.equity[:self.n_bars]
+        index = pd.DatetimeIndex(bars['date'].view('datetime64[ns]'), name='Date')
+        return pd.DataFrame({'Cash': bars['cash'], 'Total Value': bars['value']}, index=index, copy=False)
+
+    def holdings_frame(self):
+        """Shares held per ticker at the end of every bar."""
+        index = pd.DatetimeIndex(self.equity['date'][:self.n_bars].view('datetime64[ns]'), name='Date')
+        return pd.DataFrame(self.holdings[:self.n_bars], index=index, columns=self.tickers, copy=False)
+
+    def fills_frame(self):
+        """One row per trade: date, ticker, side (1 buy / -1 sell), shares, price, fee."""
+        return fills_to_frame(self.fills[:self.n_fills], self.tickers)
+
+    def to_parquet(self, prefix):
+        """
+        Writes <prefix>_equity.parquet, <prefix>_holdings.parquet and
+        <prefix>_fills.parquet (needs pyarrow or fastparquet).
+        """
+        self.equity_frame().to_parquet(f"{prefix}_equity.parquet")
+        holdings = self.holdings_frame()
+        holdings.columns = [str(t) for t in holdings.columns]
+        holdings.to_parquet(f"{prefix}_holdings.parquet")
+        self.fills_frame().to_parquet(f"{prefix}_fills.parquet", index=False)
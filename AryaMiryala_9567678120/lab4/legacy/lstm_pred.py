@@ -1,6 +1,7 @@
 
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 from sklearn.preprocessing import MinMaxScaler
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense
@@ -12,17 +13,9 @@ def prepare_lstm_data(prices, lookback=60):
     scaler = MinMaxScaler(feature_range=(0, 1))
     scaled_prices = scaler.fit_transform(prices)
 
-    X, y = [], []
-
-    for i in range(lookback, len(scaled_prices)):
-        X.append(scaled_prices[i - lookback:i, 0])
-        y.append(scaled_prices[i, 0])
-
-    X = np.array(X)
-    y = np.array(y)
-
-    # reshape for LSTM: (samples, time steps, features)
-    X = np.reshape(X, (X.shape[0], X.shape[1], 1))
+    # sliding windows as a view, reshaped for LSTM: (samples, time steps, features)
+    X = sliding_window_view(scaled_prices[:-1, 0], lookback)[..., np.newaxis]
+    y = scaled_prices[lookback:, 0]
 
     return X, y, scaler
 
@@ -43,13 +36,7 @@ def predict_lstm(model, prices, scaler, lookback=60):
     prices = np.array(prices).reshape(-1, 1)
     scaled_prices = scaler.transform(prices)
 
-    X = []
-
-    for i in range(lookback, len(scaled_prices)):
-        X.append(scaled_prices[i - lookback:i, 0])
-
-    X = np.array(X)
-    X = np.reshape(X, (X.shape[0], X.shape[1], 1))
+    X = sliding_window_view(scaled_prices[:-1, 0], lookback)[..., np.newaxis]
 
     predictions = model.predict(X)
     predictions = scaler.inverse_transform(predictions)
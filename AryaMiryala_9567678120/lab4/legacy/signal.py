@@ -5,34 +5,28 @@ import numpy as np
 #use LSTM to forecast prices, then apply a moving-average-based rule to 
 # turn those forecasts into trading signals.
 
+# the legacy scripts run from this folder on their own, so the crossover rule
+# is written out here instead of imported from lab4 (crossover.crossover_events
+# and indicators.rolling_mean give the same signals)
+
 #calculates the moving average from price data
 def moving_avg(price, window):
-    prices = pd.Series(prices)
-    return prices.rolling(window=window).mean()
+    return pd.Series(price).rolling(window=window).mean()
 
 #decision logic. Buy, Sell, or hold
 def mov_avg_alg(prices, short_window, long_window):
     #1-buy, -1 sell, 0- hold
     prices = pd.Series(prices)
 
-    short_ma = moving_avg(prices, short_window)
-    long_ma = moving_avg(prices, long_window)
-
-    signals = pd.Series(0, index=prices.index)
-
-    for i in range(1, len(prices)):
-        # Buy signal: short MA crosses above long MA
-        if short_ma[i] > long_ma[i] and short_ma[i-1] <= long_ma[i-1]:
-            signals[i] = 1
+    short_ma = moving_avg(prices, short_window).to_numpy()
+    long_ma = moving_avg(prices, long_window).to_numpy()
 
-        # Sell signal: short MA crosses below long MA
-        elif short_ma[i] < long_ma[i] and short_ma[i-1] >= long_ma[i-1]:
-            signals[i] = -1
-
-        # Otherwise: Hold
-        else:
-            signals[i] = 0
+    # one vectorized pass instead of walking the series element by element;
+    # comparisons with the NaN warm-up bars are False, so they never trigger
+    prev_short = np.concatenate(([np.nan], short_ma[:-1]))
+    prev_long = np.concatenate(([np.nan], long_ma[:-1]))
+    buy = (short_ma > long_ma) & (prev_short <= prev_long)
+    sell = (short_ma < long_ma) & (prev_short >= prev_long)
+    signals = pd.Series(np.where(buy, 1, np.where(sell, -1, 0)).astype(np.int64), index=prices.index)
 
     return signals
-
-
@@ -0,0 +1,100 @@
+import numpy as np
+import tensorflow as tf
+from numpy.lib.stride_tricks import sliding_window_view
+from sklearn.preprocessing import MinMaxScaler
+
+import strategies
+import lstm_numpy
+
+# one LSTM shared by many tickers instead of one model.fit per ticker
+# every ticker gets its own MinMaxScaler, the scaled series are laid end to end
+# in a single float32 buffer and tf.data cuts the windows out of it batch by
+# batch, so the (samples, lookback, 1) tensor for the universe never exists
+
+def scale_universe(prices_df, lookback):
+    """
+    Fits one MinMaxScaler per ticker and packs the scaled series together.
+    Returns (buffer, starts, ticker_ranges, scalers):
+      buffer: all scaled series back to back (float32)
+      starts: buffer offset of every training window
+      ticker_ranges: {ticker: (first, last) slice of starts belonging to it}
+    Tickers with no more than `lookback` bars are skipped.
+    """
+    series, starts, ranges, scalers = [], [], {}, {}
+    offset = 0
+    n_total = 0
+
+    for ticker in prices_df.columns:
+        prices = prices_df[ticker].dropna()
+        if len(prices) <= lookback:
+            continue
+
+        scaler = MinMaxScaler(feature_range=(0, 1))
+        scaled = scaler.fit_transform(prices.values.reshape(-1, 1)).astype(np.float32).ravel()
+
+        n_windows = len(scaled) - lookback
+        ranges[ticker] = (n_total, n_total + n_windows)
+        starts.append(offset + np.arange(n_windows, dtype=np.int64))
+        n_total += n_windows
+        series.append(scaled)
+        scalers[ticker] = scaler
+        offset += len(scaled)
+
+    buffer = np.concatenate(series) if series else np.zeros(0, dtype=np.float32)
+    starts = np.concatenate(starts) if starts else np.zeros(0, dtype=np.int64)
+    return buffer, starts, ranges, scalers
+
+def window_dataset(buffer, starts, lookback, batch_size=256, shuffle=False, seed=None):
+    """tf.data pipeline yielding (X, y) batches cut from the packed buffer."""
+    buffer = tf.constant(buffer)
+    offsets = tf.range(lookback, dtype=tf.int64)
+
+    def cut(batch_starts):
+        X = tf.gather(buffer, batch_starts[:, None] + offsets)[..., None]
+        y = tf.gather(buffer, batch_starts + lookback)
+        return X, y
+
+    ds = tf.data.Dataset.from_tensor_slices(starts)
+    if shuffle:
+        ds = ds.shuffle(min(len(starts), 100_000), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size).map(cut, num_parallel_calls=tf.data.AUTOTUNE)
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+def train_shared_lstm(prices_df, lookback=60, epochs=5, batch_size=256):
+    """
+    Trains one model on the windows of every ticker in prices_df.
+    Returns (model, scalers) with one fitted scaler per ticker.
+    """
+    buffer, starts, _, scalers = scale_universe(prices_df, lookback)
+    return _fit_shared(buffer, starts, lookback, epochs, batch_size), scalers
+
+def _fit_shared(buffer, starts, lookback, epochs, batch_size):
+    model = strategies.build_lstm_model(lookback)
+    model.fit(window_dataset(buffer, starts, lookback, batch_size, shuffle=True), epochs=epochs, verbose=0)
+    return model
+
+def run_lstm_universe(prices_df, lookback=60, epochs=5, batch_size=256):
+    """
+    Shared-model version of strategies.run_lstm_strategy for a whole universe.
+    Returns {ticker: signals_dataframe} with the usual 'positions' column.
+    """
+    buffer, starts, ranges, scalers = scale_universe(prices_df, lookback)
+    model = _fit_shared(buffer, starts, lookback, epochs, batch_size)
+
+    # numpy forward pass per ticker: its windows are one contiguous run of the
+    # buffer, so they are sliced out of the strided view without a copy
+    frozen = lstm_numpy.NumpyLSTM.from_keras(model)
+    all_windows = sliding_window_view(buffer[:-1], lookback)
+
+    signals_dict = {}
+    for ticker in prices_df.columns:
+        prices = prices_df[ticker].dropna()
+        if ticker not in ranges:
+            signals_dict[ticker] = strategies.run_lstm_strategy(prices, lookback, epochs)
+            continue
+        first, last = ranges[ticker]
+        windows = all_windows[starts[first]:starts[first] + (last - first)]
+        predicted_prices = scalers[ticker].inverse_transform(frozen.predict(windows))
+        signals_dict[ticker] = strategies.lstm_signals_from_predictions(prices, predicted_prices, lookback)
+
+    return signals_dict
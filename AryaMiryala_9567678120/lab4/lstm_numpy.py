@@ -0,0 +1,122 @@
+import numpy as np
+
+# pure numpy inference for the LSTM(50) + Dense(1) model from strategies.build_lstm_model
+# export_lstm() freezes the keras weights (and the MinMaxScaler params) into an
+# .npz file, NumpyLSTM runs the batched forward pass from it without tensorflow
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+class NumpyLSTM:
+    def __init__(self, kernel, recurrent_kernel, bias, dense_kernel, dense_bias,
+                 tickers=None, data_min=None, data_range=None):
+        # float32 like keras, it is also roughly twice as fast as float64 here
+        self.kernel = np.asarray(kernel, dtype=np.float32)
+        self.recurrent_kernel = np.asarray(recurrent_kernel, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.dense_kernel = np.asarray(dense_kernel, dtype=np.float32)
+        self.dense_bias = np.asarray(dense_bias, dtype=np.float32)
+        self.units = self.recurrent_kernel.shape[0]
+
+        # MinMaxScaler params, one row per ticker (or a single row)
+        self.tickers = list(tickers) if tickers is not None else []
+        self._ticker_rows = {t: i for i, t in enumerate(self.tickers)}
+        self.data_min = None if data_min is None else np.asarray(data_min, dtype=np.float64)
+        self.data_range = None if data_range is None else np.asarray(data_range, dtype=np.float64)
+
+    @classmethod
+    def from_keras(cls, model, scalers=None):
+        """
+        Copies the weights out of a trained keras model.
+        scalers: a fitted MinMaxScaler, {ticker: scaler}, or None
+        """
+        lstm, dense = model.layers[0], model.layers[1]
+        kernel, recurrent_kernel, bias = lstm.get_weights()
+        dense_kernel, dense_bias = dense.get_weights()
+
+        tickers, data_min, data_range = None, None, None
+        if isinstance(scalers, dict):
+            tickers = list(scalers)
+            data_min = np.array([scalers[t].data_min_[0] for t in tickers])
+            data_range = np.array([scalers[t].data_range_[0] for t in tickers])
+        elif scalers is not None:
+            data_min, data_range = scalers.data_min_[:1], scalers.data_range_[:1]
+        if data_range is not None:
+            # MinMaxScaler treats a flat series as range 1
+            data_range = np.where(data_range == 0, 1.0, data_range)
+
+        return cls(kernel, recurrent_kernel, bias, dense_kernel, dense_bias, tickers, data_min, data_range)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as f:
+            params = {k: f[k] for k in f.files}
+        tickers = params.pop('tickers', None)
+        return cls(tickers=None if tickers is None else tickers.tolist(), **params)
+
+    def save(self, path):
+        params = dict(
+            kernel=self.kernel, recurrent_kernel=self.recurrent_kernel, bias=self.bias,
+            dense_kernel=self.dense_kernel, dense_bias=self.dense_bias,
+        )
+        if self.data_min is not None:
+            params.update(data_min=self.data_min, data_range=self.data_range)
+        if self.tickers:
+            params['tickers'] = np.array(self.tickers)
+        np.savez(path, **params)
+
+    def predict(self, X, batch_size=4096):
+        """
+        Forward pass on scaled windows, X shape (samples, lookback) or
+        (samples, lookback, 1). Returns (samples, 1) like model.predict.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 3:
+            X = X[..., 0]
+        out = np.empty((len(X), 1), dtype=np.float32)
+        for start in range(0, len(X), batch_size):
+            out[start:start + batch_size] = self._forward(X[start:start + batch_size])
+        return out
+
+    def _forward(self, X):
+        n, u = len(X), self.units
+        h = np.zeros((n, u), dtype=np.float32)
+        c = np.zeros((n, u), dtype=np.float32)
+        w = self.kernel[0] # one input feature
+
+        # keras gate order is input, forget, cell, output
+        for t in range(X.shape[1]):
+            z = X[:, t:t + 1] * w + h @ self.recurrent_kernel + self.bias
+            i = _sigmoid(z[:, :u])
+            f = _sigmoid(z[:, u:2 * u])
+            g = np.tanh(z[:, 2 * u:3 * u])
+            o = _sigmoid(z[:, 3 * u:])
+            c = f * c + i * g
+            h = o * np.tanh(c)
+
+        return h @ self.dense_kernel + self.dense_bias
+
+    def _scaler_rows(self, tickers):
+        if self.data_min is None:
+            raise ValueError("No scaler was exported with this model")
+        if tickers is None:
+            return self.data_min[:1], self.data_range[:1]
+        idx = np.array([self._ticker_rows[t] for t in tickers])
+        return self.data_min[idx], self.data_range[idx]
+
+    def predict_prices(self, windows, tickers=None):
+        """
+        Raw-price version of predict: windows is (samples, lookback) of prices,
+        tickers names the scaler for each row (None = the single exported scaler).
+        Returns the predicted next price for every row.
+        """
+        data_min, data_range = self._scaler_rows(tickers)
+        windows = np.asarray(windows, dtype=np.float64)
+        scaled = (windows - data_min[:, None]) / data_range[:, None]
+        return self.predict(scaled)[:, 0].astype(np.float64) * data_range + data_min
+
+def export_lstm(model, scalers, path):
+    """Freezes a trained keras model (and its scaler(s)) into an .npz for NumpyLSTM.load."""
+    frozen = NumpyLSTM.from_keras(model, scalers)
+    frozen.save(path)
+    return frozen
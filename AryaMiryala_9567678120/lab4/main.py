@@ -1,107 +1,195 @@
+import argparse
+import os
 import pandas as pd
 import data_loader
-import strategies
+import events
+import price_store
+import resample
 import backtester
-import matplotlib.pyplot as plt
+import incremental
+import model_store
+import profiling
+import registry
+import results_store
+import scheduler
+
+# task graph node (module level so worker processes can import it)
+def backtest_strategy(prices_df, name, initial_capital, trans_cost, signals=None, blocks=None):
+    # blocks: {strategy: signals} of every ticker block, joined back into one universe
+    if blocks is not None:
+        parts = [block[name] for block in blocks]
+        if isinstance(parts[0], events.SignalEvents):
+            signals = events.SignalEvents.concat(parts)
+        else:
+            signals = {ticker: frame for part in parts for ticker, frame in part.items()}
+    # the ledger carries the equity curve and every fill
+    portfolio = backtester.Portfolio(initial_capital, trans_cost)
+    portfolio.run_backtest(prices_df, signals, engine='array')
+    return portfolio.ledger
+
+STAGES = ['load data', 'signals & backtest', 'store results', 'incremental update', 'metrics', 'plot']
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Backtest the lab4 strategies")
+    parser.add_argument('--strategies', nargs='+', default=list(registry.STRATEGIES),
+                        help=f"strategies to run (default: all of {', '.join(registry.STRATEGIES)})")
+    parser.add_argument('--offline', action='store_true', help="only use prices already in the local store")
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes (1 = serial)")
+    parser.add_argument('--no-plot', action='store_true', help="skip the matplotlib chart")
+    parser.add_argument('--import-report', action='store_true', help="print what each strategy cost to import")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only apply the bars since the last --incremental run (first run replays the history)")
+    parser.add_argument('--rebuild', action='store_true', help="with --incremental: drop the saved state and refit")
+    parser.add_argument('--profile', action='store_true',
+                        help="print time / memory per stage, strategy and ticker and save it to data/profiles")
+    parser.add_argument('--trace-memory', action='store_true', help="with --profile: allocations per stage (tracemalloc)")
+    parser.add_argument('--profile-stage', default=None, choices=STAGES, help="run this stage under a profiler")
+    parser.add_argument('--profiler', default='cprofile', choices=['cprofile', 'sampling'],
+                        help="cProfile, or pyinstrument's sampling profiler for --profile-stage")
+    return parser.parse_args()
 
 def main():
-    
+    args = parse_args()
+
     tickers = ['AAPL', 'NVDA', 'TSLA'] # multiple stocks
     start_date = "2024-01-01"
     end_date = "2026-02-04"
     initial_capital = 100000.0
     trans_cost = 5.0 # transacation fee
+    offline = args.offline # True = only use prices already in the local store
+    interval = "1d" # bar size, intraday like "1m" also works (yfinance keeps ~30 days of 1m bars)
+    n_jobs = args.jobs # worker processes for the task graph, None = one per core, 1 = serial
+    strategy_names = args.strategies # heavy libraries are only imported for the ones picked
+    # model params per strategy (the defaults, spelled out), recorded with every stored run
+    strategy_params = {
+        'SMA': {'short_window': 20, 'long_window': 50},
+        'Hybrid': {'short_window': 20, 'long_window': 50, 'rsi_period': 14},
+        'ARIMA': {'order': (5,1,0)},
+        'LSTM': {'lookback': 60, 'epochs': 5},
+    }
+    # every stage is timed; --profile prints / saves it, --profile-stage profiles one stage
+    prof = profiling.Profiler(trace_memory=args.trace_memory, profile_stage=args.profile_stage, profiler=args.profiler)
 
 
-    print("--- Loading Data ---")
-    prices_df = data_loader.fetch_data(tickers, start_date, end_date)
-    print(prices_df.head())
-
-   
-    print("\n--- Generating Signals ---")
-    
-   
-    sma_signals = {}
-    hybrid_signals = {}
-    arima_signals = {}
-    lstm_signals = {}
-    
-    for ticker in tickers:
-        print(f"Processing {ticker}...")
-        stock_prices = prices_df[ticker].dropna()
-        
-        # sma
-        sma_signals[ticker] = strategies.generate_sma_signals(stock_prices)
-        
-        # hybrid
-        hybrid_signals[ticker] = strategies.generate_hybrid_signals(stock_prices)
-
-        # arima
-        arima_signals[ticker] = strategies.generate_arima_signals(stock_prices)
-        
-        # lstm
-        print(f"  Training LSTM for {ticker}...")
-        lstm_signals[ticker] = strategies.run_lstm_strategy(stock_prices)
-        
-    
-    # backtest
-    print("\n--- Running Backtest (SMA Portfolio) ---")
-    portfolio_sma = backtester.Portfolio(initial_capital, transaction_cost=trans_cost)
-    results_sma = portfolio_sma.run_backtest(prices_df, sma_signals)
-    
-    print("\n--- Running Backtest (Hybrid Portfolio) ---")
-    portfolio_hybrid = backtester.Portfolio(initial_capital, transaction_cost=trans_cost)
-    results_hybrid = portfolio_hybrid.run_backtest(prices_df, hybrid_signals)
-
-    print("\n--- Running Backtest (ARIMA Portfolio) ---")
-    portfolio_arima = backtester.Portfolio(initial_capital, transaction_cost=trans_cost)
-    results_arima = portfolio_arima.run_backtest(prices_df, arima_signals)
-
-    print("\n--- Running Backtest (LSTM Portfolio) ---")
-    portfolio_lstm = backtester.Portfolio(initial_capital, transaction_cost=trans_cost)
-    results_lstm = portfolio_lstm.run_backtest(prices_df, lstm_signals)
+    store = price_store.PriceStore(interval=interval) # local cache, only missing dates get downloaded
+    bars_per_year = resample.periods_per_year(interval)
 
-    # Calculate Metrics
-    ret_sma, sharpe_sma, val_sma = backtester.calculate_metrics(results_sma, initial_capital)
-    ret_hyb, sharpe_hyb, val_hyb = backtester.calculate_metrics(results_hybrid, initial_capital)
-    ret_ari, sharpe_ari, val_ari = backtester.calculate_metrics(results_arima, initial_capital)
-    ret_lst, sharpe_lst, val_lst = backtester.calculate_metrics(results_lstm, initial_capital)
+    if args.incremental:
+        # daily refresh: every strategy keeps its indicator / model / portfolio
+        # state in data/incremental and only applies the bars since its last run
+        print("--- Incremental Update ---")
+        # up to yesterday: today's bar is still forming and would be stored as final
+        end_date = pd.Timestamp.today().normalize().strftime('%Y-%m-%d')
+        with prof.stage('incremental update'):
+            books = incremental.daily_update(strategy_names, tickers, start_date, end_date, initial_capital, trans_cost,
+                                             store, offline, interval, strategy_params, n_jobs, args.rebuild)
+        results = pd.concat({name: book.equity() for name, book in books.items()}, axis=1)
+    else:
+        print("--- Loading Data ---")
+        with prof.stage('load data'):
+            prices_df = data_loader.fetch_data(tickers, start_date, end_date, store=store, offline=offline, interval=interval)
+        print(prices_df.head())
+
+
+        print("\n--- Generating Signals & Backtesting ---")
+        # every strategy / backtest is a node in a task graph: independent nodes run
+        # in parallel, prices go to the workers through shared memory and results
+        # are cached in cache/tasks, so a re-run only redoes what changed
+        # how the strategies run, on top of their params (not part of the results)
+        run_options = {
+            'ARIMA': {'n_jobs': 1}, # parallel over the ticker blocks instead, params cached between runs
+            'LSTM': {'store': model_store.LSTMModelStore()}, # reuses trained models across runs
+        }
+        params_of = {name: {**strategy_params.get(name, {}), **run_options.get(name, {})} for name in strategy_names}
+        graph = scheduler.Scheduler(n_jobs=n_jobs)
+        # 'events' / 'universe' strategies run per block of tickers, one block per
+        # worker, and each backtest joins the blocks of its strategy
+        block_size = -(-len(tickers) // (n_jobs or os.cpu_count() or 1))
+        blocks = [tickers[i:i + block_size] for i in range(0, len(tickers), block_size)]
+
+        with prof.stage('signals & backtest') as stage, scheduler.SharedFrame(prices_df) as prices:
+            # the 'events' strategies (SMA, Hybrid) share a node per block, so the
+            # rolling means they have in common are computed once per ticker;
+            # only their buy / sell events are kept (int8 + int32 offsets)
+            event_names = [n for n in strategy_names if registry.STRATEGIES[n].mode == 'events']
+            event_params = {n: params_of[n] for n in event_names}
+            event_blocks = [graph.add(f'events:block{i}', registry.run_block, event_names, prices, block, event_params,
+                                      code=registry.target_modules(event_names))
+                            for i, block in enumerate(blocks)] if event_names else []
+            for name in strategy_names:
+                spec = registry.STRATEGIES[name]
+                params = params_of[name]
+                # the strategy's module is loaded by name, so it is added to the nodes' cache keys
+                code = registry.target_modules([name])
+                if spec.mode == 'ticker':
+                    # one node per ticker, the backtest gets {ticker: signals}
+                    deps = {'signals': {t: graph.add(f'{name}:{t}', registry.run_ticker, name, prices, t, code=code, **params)
+                                        for t in tickers}}
+                elif spec.mode == 'events':
+                    deps = {'blocks': event_blocks}
+                else:
+                    deps = {'blocks': [graph.add(f'{name}:block{i}', registry.run_block, [name], prices, block, {name: params},
+                                                 code=code) for i, block in enumerate(blocks)]}
+                graph.add(f'backtest:{name}', backtest_strategy, prices, name, initial_capital, trans_cost, deps=deps)
+
+            outputs = graph.run()
+            prof.add_tasks(stage, graph)
 
+        print(graph.report())
+        if args.import_report:
+            # the imports happen in the workers, their spans came back with the tasks
+            print(registry.import_report([span for detail in graph.details.values() for span in detail['spans']]))
+        ledgers = {name: outputs[f'backtest:{name}'] for name in strategy_names}
+        results = pd.concat({name: l.equity_frame()['Total Value'] for name, l in ledgers.items()}, axis=1)
+
+        # keep every run (equity, fills, metrics) in data/results for later queries
+        with prof.stage('store results'):
+            results_db = results_store.ResultsStore()
+            fingerprint = data_loader.fingerprint(prices_df)
+            for name, run_ledger in ledgers.items():
+                with profiling.span(name):
+                    params = {'initial_capital': initial_capital, 'transaction_cost': trans_cost, 'interval': interval,
+                              **strategy_params.get(name, {})}
+                    results_db.save(name, params, fingerprint, run_ledger, initial_capital, bars_per_year)
+
+    # Calculate Metrics
     print("\n" + "="*30)
     print(f"FINAL RESULTS (Initial: ${initial_capital:,.2f})")
     print("="*30)
-    print(f"SMA Strategy:")
-    print(f"  Final Value: ${val_sma:,.2f}")
-    print(f"  Return: {ret_sma:.2%}")
-    print(f"  Sharpe Ratio: {sharpe_sma:.2f}")
-    print("-" * 20)
-    print(f"Hybrid Strategy:")
-    print(f"  Final Value: ${val_hyb:,.2f}")
-    print(f"  Return: {ret_hyb:.2%}")
-    print(f"  Sharpe Ratio: {sharpe_hyb:.2f}")
-    print("-" * 20)
-    print(f"ARIMA Strategy:")
-    print(f"  Final Value: ${val_ari:,.2f}")
-    print(f"  Return: {ret_ari:.2%}")
-    print(f"  Sharpe Ratio: {sharpe_ari:.2f}")
-    print("-" * 20)
-    print(f"LSTM Strategy:")
-    print(f"  Final Value: ${val_lst:,.2f}")
-    print(f"  Return: {ret_lst:.2%}")
-    print(f"  Sharpe Ratio: {sharpe_lst:.2f}")
-    
-    plt.figure(figsize=(12,7))
-    plt.plot(results_sma.index, results_sma['Total Value'], label='SMA Portfolio')
-    plt.plot(results_hybrid.index, results_hybrid['Total Value'], label='Hybrid Portfolio')
-    plt.plot(results_arima.index, results_arima['Total Value'], label='ARIMA Portfolio', linestyle='--')
-    plt.plot(results_lstm.index, results_lstm['Total Value'], label='LSTM Portfolio', linestyle='-.')
-    
-    plt.title(f"Portfolio Performance (Transaction Cost: ${trans_cost})")
-    plt.xlabel("Date")
-    plt.ylabel("Portfolio Value ($)")
-    plt.legend()
-    plt.grid(True)
-    plt.show()
+    with prof.stage('metrics'):
+        for i, name in enumerate(strategy_names):
+            ret, sharpe, val = backtester.calculate_metrics(results, initial_capital, column=name, periods_per_year=bars_per_year)
+            if i:
+                print("-" * 20)
+            print(f"{name} Strategy:")
+            print(f"  Final Value: ${val:,.2f}")
+            print(f"  Return: {ret:.2%}")
+            print(f"  Sharpe Ratio: {sharpe:.2f}")
+
+    if not args.no_plot:
+        # building the chart is timed, the time the window stays open is not
+        with prof.stage('plot'):
+            import matplotlib.pyplot as plt
+
+            linestyles = {'ARIMA': '--', 'LSTM': '-.'}
+            plt.figure(figsize=(12,7))
+            for name in strategy_names:
+                plt.plot(results.index, results[name], label=f'{name} Portfolio', linestyle=linestyles.get(name, '-'))
+
+            plt.title(f"Portfolio Performance (Transaction Cost: ${trans_cost})")
+            plt.xlabel("Date")
+            plt.ylabel("Portfolio Value ($)")
+            plt.legend()
+            plt.grid(True)
+
+    if args.profile or args.profile_stage:
+        print("\n" + prof.summary())
+        if prof.profile_text:
+            print(f"\n--- {args.profile_stage} ({args.profiler}) ---\n{prof.profile_text}")
+        print(f"profile saved to {prof.save()}")
+
+    if not args.no_plot:
+        plt.show()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+# vectorized metrics for many equity curves at once
+# curves are a (portfolios, dates) array, or the wide DataFrame that
+# backtester.run_batch_backtest returns (one column per portfolio); every
+# metric is computed for all portfolios in one numpy pass along the date axis
+
+def _curves(values):
+    # (portfolios, dates) float array and the portfolio names
+    if isinstance(values, pd.DataFrame):
+        return values.to_numpy(dtype=np.float64).T, list(values.columns)
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    return values, list(range(values.shape[0]))
+
+def returns(values):
+    """Bar-to-bar simple returns, (portfolios, dates - 1), like pct_change()."""
+    values, _ = _curves(values)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return values[:, 1:] / values[:, :-1] - 1.0
+
+def sharpe(rets, periods_per_year=252):
+    """Annualized Sharpe, same formula as backtester.calculate_metrics (ddof=1, no risk-free rate)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.sqrt(periods_per_year) * rets.mean(axis=1) / rets.std(axis=1, ddof=1)
+
+def sortino(rets, periods_per_year=252):
+    """Annualized Sortino: mean return over the downside deviation (returns below 0)."""
+    downside = np.sqrt(np.mean(np.minimum(rets, 0.0) ** 2, axis=1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.sqrt(periods_per_year) * rets.mean(axis=1) / downside
+
+def drawdowns(values):
+    """
+    Returns (max drawdown, longest drawdown in bars) per portfolio.
+    Max drawdown is negative, e.g. -0.25 for a 25% peak-to-trough fall.
+    """
+    values, _ = _curves(values)
+    # running maxima go down a (dates, portfolios) copy, accumulating across
+    # contiguous rows is far faster than along each portfolio's row
+    by_date = np.ascontiguousarray(values.T)
+    peak = np.maximum.accumulate(by_date, axis=0)
+    max_dd = (by_date / peak - 1.0).min(axis=0)
+
+    # bars since the last new high, the longest stretch is the duration
+    bars = np.arange(len(by_date))[:, None]
+    last_high = np.maximum.accumulate(np.where(by_date >= peak, bars, 0), axis=0)
+    duration = (bars - last_high).max(axis=0)
+    return max_dd, duration
+
+def turnover(positions, periods_per_year=252):
+    """
+    Trades per year for every portfolio.
+    positions: (portfolios, dates) or (portfolios, dates, tickers) array of
+               +1 / -1 / 0 (e.g. backtester.stack_positions, sweep.positions_grid)
+    """
+    positions = np.asarray(positions)
+    trades = ((positions == 1) | (positions == -1)).reshape(positions.shape[0], positions.shape[1], -1)
+    years = positions.shape[1] / periods_per_year
+    return trades.sum(axis=(1, 2)) / years
+
+def rolling_sharpe(values, window=63, periods_per_year=252):
+    """
+    Annualized Sharpe over a trailing `window` of returns, (portfolios, dates)
+    aligned with the curves, NaN until a full window is available.
+    Uses running sums, so the cost does not depend on the window.
+    """
+    rets = returns(values)
+    n_portfolios, n_rets = rets.shape
+    out = np.full((n_portfolios, n_rets + 1), np.nan)
+    if n_rets < window or window < 2:
+        return out
+
+    s1 = np.cumsum(np.pad(rets, ((0, 0), (1, 0))), axis=1)
+    s2 = np.cumsum(np.pad(rets ** 2, ((0, 0), (1, 0))), axis=1)
+    total = s1[:, window:] - s1[:, :-window]
+    total_sq = s2[:, window:] - s2[:, :-window]
+    mean = total / window
+    var = np.maximum(total_sq - total * mean, 0.0) / (window - 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[:, window:] = np.sqrt(periods_per_year) * mean / np.sqrt(var)
+    return out
+
+def equity_metrics(values, initial_capital=None, periods_per_year=252, positions=None):
+    """
+    Metrics table for many equity curves, one row per portfolio.
+    values: (portfolios, dates) array or run_batch_backtest DataFrame
+    initial_capital: starting value for total return / CAGR (None = first bar)
+    positions: optional position array (see turnover) for a turnover column
+    Columns: total_return, cagr, sharpe, sortino, max_drawdown,
+    drawdown_duration (bars), final_value and turnover (trades per year).
+    """
+    curves, names = _curves(values)
+    start = curves[:, 0] if initial_capital is None else np.full(len(curves), float(initial_capital))
+    final = curves[:, -1]
+    rets = returns(curves)
+    years = max(curves.shape[1] - 1, 1) / periods_per_year
+    max_dd, duration = drawdowns(curves)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        table = pd.DataFrame({
+            'total_return': final / start - 1.0,
+            'cagr': (final / start) ** (1.0 / years) - 1.0,
+            'sharpe': sharpe(rets, periods_per_year),
+            'sortino': sortino(rets, periods_per_year),
+            'max_drawdown': max_dd,
+            'drawdown_duration': duration,
+            'final_value': final,
+        }, index=names)
+    if positions is not None:
+        table['turnover'] = turnover(positions, periods_per_year)
+    return table
+
+def rank(table, by='sharpe', ascending=False, top=None):
+    """Sorts a metrics table (or sweep result) by one column, NaNs last."""
+    ranked = table.sort_values(by, ascending=ascending, na_position='last', kind='stable')
+    return ranked if top is None else ranked.head(top)
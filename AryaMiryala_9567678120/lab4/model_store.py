@@ -0,0 +1,70 @@
+import os
+import json
+import pickle
+
+import data_loader
+import lstm_numpy
+
+# on-disk store for trained LSTM weights and their fitted MinMaxScaler
+# there is one entry per (ticker, lookback, epochs, architecture); its metadata
+# records the fingerprint and length of the prices it was trained on, so a
+# lookup can tell apart
+#   'hit'    - same data, reuse as is
+#   'extend' - the stored data is a prefix of the new data (new bars were
+#              appended), fine-tune on the new bars only
+#   'miss'   - anything else, train from scratch
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'lstm')
+
+class LSTMModelStore:
+    def __init__(self, root=CACHE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _base(self, ticker, lookback, epochs, arch):
+        return os.path.join(self.root, f"{ticker}-lb{lookback}-ep{epochs}-{arch}")
+
+    def lookup(self, ticker, prices, lookback, epochs, arch):
+        """Returns (status, entry) where status is 'hit', 'extend' or 'miss'."""
+        base = self._base(ticker, lookback, epochs, arch)
+        if not os.path.exists(base + '.json'):
+            return 'miss', None
+        with open(base + '.json') as f:
+            entry = json.load(f)
+
+        n_bars = entry['n_bars']
+        if n_bars == len(prices) and entry['fingerprint'] == data_loader.fingerprint(prices):
+            return 'hit', entry
+        if n_bars < len(prices) and entry['fingerprint'] == data_loader.fingerprint(prices.iloc[:n_bars]):
+            return 'extend', entry
+        return 'miss', None
+
+    def load(self, entry, model):
+        """Loads the stored weights into `model` (built with the same architecture) and returns the scaler."""
+        model.load_weights(entry['weights'])
+        with open(entry['scaler'], 'rb') as f:
+            return pickle.load(f)
+
+    def save(self, ticker, prices, lookback, epochs, arch, model, scaler):
+        base = self._base(ticker, lookback, epochs, arch)
+        entry = {
+            'ticker': ticker,
+            'fingerprint': data_loader.fingerprint(prices),
+            'n_bars': len(prices),
+            'last_date': str(prices.index[-1]),
+            'lookback': lookback,
+            'epochs': epochs,
+            'arch': arch,
+            'weights': base + '.weights.h5',
+            'scaler': base + '.scaler.pkl',
+            'frozen': base + '.npz',
+        }
+        model.save_weights(entry['weights'])
+        # tensorflow-free copy for serving, see lstm_numpy.NumpyLSTM.load
+        lstm_numpy.export_lstm(model, scaler, entry['frozen'])
+        with open(entry['scaler'], 'wb') as f:
+            pickle.dump(scaler, f)
+        # metadata last, so a half-written entry is never picked up
+        with open(base + '.json', 'w') as f:
+            json.dump(entry, f, indent=2)
+        return entry
@@ -0,0 +1,121 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+# local on-disk price cache used by data_loader.fetch_data
+# every ticker gets a folder with one .npy file per column (int64 ns
+# timestamps and float64 closes) that is read back with memory-mapping, plus a
+# meta.json listing the date ranges already downloaded (so weekends / holidays
+# inside a covered range are not mistaken for missing data)
+#
+#   data/prices/<interval>/<ticker>/timestamp.npy
+#                                  /close.npy
+#                                  /meta.json
+
+STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'prices')
+
+def to_ns(dates):
+    """Dates / DatetimeIndex -> int64 nanoseconds since epoch (UTC, tz dropped)."""
+    idx = pd.DatetimeIndex(pd.to_datetime(dates))
+    if idx.tz is not None:
+        idx = idx.tz_convert('UTC').tz_localize(None)
+    return idx.values.astype('datetime64[ns]').astype(np.int64)
+
+def _merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+class PriceStore:
+    def __init__(self, root=STORE_DIR, interval='1d'):
+        self.root = root
+        self.interval = interval
+
+    def _dir(self, ticker):
+        return os.path.join(self.root, self.interval, ticker)
+
+    def _meta(self, ticker):
+        path = os.path.join(self._dir(ticker), 'meta.json')
+        if not os.path.exists(path):
+            return {'covered': []}
+        with open(path) as f:
+            return json.load(f)
+
+    def tickers(self):
+        base = os.path.join(self.root, self.interval)
+        return sorted(os.listdir(base)) if os.path.isdir(base) else []
+
+    def missing_ranges(self, ticker, start, end):
+        """Parts of [start, end) not downloaded yet, as [(start_ns, end_ns), ...]."""
+        start, end = int(to_ns([start])[0]), int(to_ns([end])[0])
+        missing = []
+        cursor = start
+        for lo, hi in self._meta(ticker)['covered']:
+            if hi <= cursor or lo >= end:
+                continue
+            if lo > cursor:
+                missing.append((cursor, lo))
+            cursor = max(cursor, hi)
+        if cursor < end:
+            missing.append((cursor, end))
+        return missing
+
+    def columns(self, ticker):
+        """Memory-mapped (timestamps, closes) arrays for a ticker (empty if unknown)."""
+        folder = self._dir(ticker)
+        if not os.path.exists(os.path.join(folder, 'timestamp.npy')):
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        ts = np.load(os.path.join(folder, 'timestamp.npy'), mmap_mode='r')
+        close = np.load(os.path.join(folder, 'close.npy'), mmap_mode='r')
+        return ts, close
+
+    def load(self, ticker, start=None, end=None):
+        """Close prices in [start, end) as a Series indexed by date."""
+        ts, close = self.columns(ticker)
+        lo = 0 if start is None else np.searchsorted(ts, to_ns([start])[0], side='left')
+        hi = len(ts) if end is None else np.searchsorted(ts, to_ns([end])[0], side='left')
+        index = pd.DatetimeIndex(ts[lo:hi].astype('datetime64[ns]'), name='Date')
+        return pd.Series(np.asarray(close[lo:hi]), index=index, name=ticker)
+
+    def load_frame(self, tickers, start=None, end=None):
+        """Wide Close DataFrame (columns are tickers), like fetch_data returns."""
+        df = pd.concat([self.load(t, start, end) for t in tickers], axis=1)
+        df.columns = list(tickers)
+        return df
+
+    def write(self, ticker, close, start, end):
+        """
+        Merges downloaded closes (Series indexed by date) into the store and
+        marks [start, end) as covered.
+        """
+        folder = self._dir(ticker)
+        os.makedirs(folder, exist_ok=True)
+
+        old_ts, old_close = self.columns(ticker)
+        close = close.dropna()
+        new_ts = to_ns(close.index)
+
+        ts = np.concatenate([np.asarray(old_ts), new_ts])
+        values = np.concatenate([np.asarray(old_close), close.to_numpy(dtype=np.float64)])
+        # newer downloads win on overlapping timestamps
+        order = np.argsort(ts, kind='stable')[::-1]
+        ts, first = np.unique(ts[order], return_index=True)
+        values = values[order][first]
+
+        # write to temp files first so readers never see a half-written column
+        for name, arr in (('timestamp', ts), ('close', values)):
+            tmp = os.path.join(folder, f'{name}.tmp.npy')
+            np.save(tmp, arr)
+            os.replace(tmp, os.path.join(folder, f'{name}.npy'))
+
+        # never mark today or the future as covered, those bars may still come in
+        end_ns = min(int(to_ns([end])[0]), int(to_ns([pd.Timestamp.now().normalize()])[0]))
+        meta = self._meta(ticker)
+        meta['covered'] = _merge_ranges(meta['covered'] + [[int(to_ns([start])[0]), end_ns]])
+        with open(os.path.join(folder, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
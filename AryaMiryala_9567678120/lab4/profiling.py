@@ -0,0 +1,275 @@
+import cProfile
+import importlib
+import io
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# per-stage instrumentation for main.py
+# Profiler.stage() wraps a pipeline stage and records wall / cpu time, RSS at
+# the end, the peak RSS during the stage and, with trace_memory, the peak and
+# net python / numpy allocations of that stage (tracemalloc). One stage can also be run
+# under cProfile (or pyinstrument's sampling profiler, if installed).
+# inside a stage, span() times finer steps such as one ticker; spans are only
+# collected while something listens, so in normal runs they cost a dict lookup.
+# the scheduler collects the spans of every task in its worker and hands them
+# back with the result, so per-strategy / per-ticker times survive the pool.
+# peak RSS per stage / task comes from linux's VmHWM, restarted at the start of
+# the block through /proc/self/clear_refs. where that is not possible (macOS,
+# windows, no /proc) the only peak is the process one since it started, kept
+# under a different name (process_peak_rss_mb) so it is not read as the stage's.
+
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'profiles')
+
+_spans = None # [(label, seconds)] while collecting in this process
+IMPORT_TIMES = {} # module -> seconds, for modules first imported through import_module() here
+
+@contextmanager
+def span(label):
+    """Times the block into the active collector (does nothing when none is active)."""
+    if _spans is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if _spans is not None:
+            _spans.append((str(label), time.perf_counter() - start))
+
+@contextmanager
+def collect():
+    """Collects the span() timings of the block into the yielded list (nested collectors are separate)."""
+    global _spans
+    outer, _spans = _spans, []
+    try:
+        yield _spans
+    finally:
+        _spans = outer
+
+def import_module(module):
+    """importlib.import_module, timed (IMPORT_TIMES and a span 'import <module>') when it really imports."""
+    if module in sys.modules:
+        return sys.modules[module]
+    start = time.perf_counter()
+    with span(f'import {module}'):
+        mod = importlib.import_module(module)
+    IMPORT_TIMES[module] = time.perf_counter() - start
+    return mod
+
+def rss_mb():
+    """Current resident set size of this process (None where /proc is missing)."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+def max_rss_mb():
+    """
+    Peak resident set size of this process so far (None on windows). On linux
+    track_peak_rss() restarts the counter this reads.
+    """
+    try:
+        import resource
+    except ImportError: # windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == 'darwin' else rss / 2**10 # bytes on macOS, KB on linux
+
+def _vm_hwm_mb():
+    # peak RSS since start / the last clear_refs reset (linux)
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 2**10
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def _reset_peak_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5') # resets VmHWM to the current RSS
+        return True
+    except OSError:
+        return False
+
+_peaks = [] # running peaks of the open track_peak_rss() blocks, before their latest inner reset
+
+@contextmanager
+def track_peak_rss():
+    """
+    Peak RSS of the block. The yielded dict gets 'peak_rss_mb' at the end or,
+    where the counter cannot be reset, 'process_peak_rss_mb' (max_rss_mb()).
+    Blocks nest: resetting for an inner one first folds the peak so far into
+    the outer ones.
+    """
+    current = _vm_hwm_mb()
+    if current is not None:
+        _peaks[:] = [max(peak, current) for peak in _peaks]
+    out = {}
+    reset = current is not None and _reset_peak_rss()
+    _peaks.append(0.0)
+    try:
+        yield out
+    finally:
+        folded = _peaks.pop()
+        current = _vm_hwm_mb() if reset else None
+        if current is not None:
+            out['peak_rss_mb'] = max(folded, current)
+        else:
+            out['process_peak_rss_mb'] = max_rss_mb()
+
+class Profiler:
+    def __init__(self, trace_memory=False, profile_stage=None, profiler='cprofile', out_dir=PROFILE_DIR):
+        """
+        trace_memory: track allocations per stage with tracemalloc (slows numpy / pandas a little)
+        profile_stage: name of the stage to run under a profiler (None = none)
+        profiler: 'cprofile' (deterministic, stdlib) or 'sampling' (needs pyinstrument)
+        out_dir: where save() and the profiler output go
+        """
+        if profiler not in ('cprofile', 'sampling'):
+            raise ValueError(f"Unknown profiler: {profiler}")
+        self.trace_memory = trace_memory
+        self.profile_stage = profile_stage
+        self.profiler = profiler
+        self.out_dir = out_dir
+        self.stages = []
+        self.max_rss_mb = max_rss_mb() # the process peak, stage resets lower the kernel's own count
+        self.profile_text = None
+        self.profile_path = None
+        self._created = time.strftime('%Y%m%d-%H%M%S')
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Records the block as stage `name`; spans timed inside it (in this
+        process) are kept as its steps. Yields the stage's record dict.
+        """
+        record = {'stage': name, 'steps': [], 'tasks': {}}
+        profiler = self._start_profiler() if name == self.profile_stage else None
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            alloc_start = tracemalloc.get_traced_memory()[0]
+        cpu, start = time.process_time(), time.perf_counter()
+        try:
+            with collect() as spans, track_peak_rss() as peak:
+                yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            record['cpu_seconds'] = time.process_time() - cpu
+            record['steps'].extend(spans)
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                record['alloc_peak_mb'] = (peak - alloc_start) / 2**20
+                record['alloc_net_mb'] = (current - alloc_start) / 2**20
+            record['rss_mb'] = rss_mb()
+            record.update(peak)
+            seen = [v for v in (self.max_rss_mb, max_rss_mb(), *peak.values()) if v is not None]
+            self.max_rss_mb = max(seen) if seen else None
+            if profiler is not None:
+                self._stop_profiler(profiler, name)
+            self.stages.append(record)
+
+    def _start_profiler(self):
+        if self.profiler == 'sampling':
+            try:
+                from pyinstrument import Profiler as SamplingProfiler
+            except ImportError:
+                raise ImportError("profiler='sampling' needs pyinstrument (pip install pyinstrument)")
+            profiler = SamplingProfiler()
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+
+    def _stop_profiler(self, profiler, name):
+        os.makedirs(self.out_dir, exist_ok=True)
+        base = os.path.join(self.out_dir, f"profile-{self._created}-{name.replace(' ', '_')}")
+        if self.profiler == 'sampling':
+            profiler.stop()
+            self.profile_text = profiler.output_text()
+            self.profile_path = base + '.html'
+            with open(self.profile_path, 'w') as f:
+                f.write(profiler.output_html())
+        else:
+            profiler.disable()
+            self.profile_path = base + '.prof' # open with snakeviz or pstats
+            profiler.dump_stats(self.profile_path)
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(25)
+            self.profile_text = out.getvalue()
+
+    def add_tasks(self, record, scheduler):
+        """
+        Attaches a finished scheduler run to a stage: per node its status,
+        worker seconds, peak RSS while it ran and the spans it collected.
+        """
+        for name, (status, seconds) in scheduler.stats.items():
+            detail = scheduler.details.get(name, {})
+            record['tasks'][name] = {'status': status, 'seconds': seconds, **detail}
+
+    def table(self):
+        """
+        One row per stage, task and span: (stage, item, seconds, cpu, memory columns).
+        The peak RSS is the stage's / task's own, or the process peak so far where
+        it could not be measured per block (see track_peak_rss).
+        """
+        def peak(record):
+            return record.get('peak_rss_mb', record.get('process_peak_rss_mb'))
+        rows = []
+        for s in self.stages:
+            rows.append((s['stage'], '', s['seconds'], s['cpu_seconds'], s.get('alloc_peak_mb'), peak(s)))
+            for label, seconds in s['steps']:
+                rows.append((s['stage'], label, seconds, None, None, None))
+            for name, task in s['tasks'].items():
+                label = f"{name} ({task['status']})"
+                rows.append((s['stage'], label, task['seconds'], None, None, peak(task)))
+                for step, seconds in task.get('spans', []):
+                    rows.append((s['stage'], f"  {name} / {step}", seconds, None, None, None))
+        return rows
+
+    def summary(self):
+        """Printable table: wall / cpu seconds, allocation peak and peak RSS per stage, then its tasks."""
+        def num(v, fmt):
+            return '-' if v is None else format(v, fmt)
+        total = sum(s['seconds'] for s in self.stages)
+        lines = [f"{'stage':<22} {'item':<32} {'wall s':>8} {'cpu s':>8} {'alloc MB':>9} {'peak MB':>8}"]
+        for stage, item, seconds, cpu, alloc, rss in self.table():
+            lines.append(f"{stage if not item else '':<22} {item[:32]:<32} {seconds:8.3f} "
+                         f"{num(cpu, '8.3f'):>8} {num(alloc, '9.1f'):>9} {num(rss, '8.0f'):>8}")
+        lines.append(f"{'total':<22} {'':<32} {total:8.3f}")
+        if any('process_peak_rss_mb' in s for s in self.stages):
+            lines.append("peak MB: process peak so far, it cannot be reset per stage on this platform")
+        return '\n'.join(lines)
+
+    def report(self):
+        """Everything recorded, as a JSON-serializable dict."""
+        return {
+            'created': self._created,
+            'trace_memory': self.trace_memory,
+            'profile_stage': self.profile_stage,
+            'profile_path': self.profile_path,
+            'max_rss_mb': self.max_rss_mb,
+            'total_seconds': sum(s['seconds'] for s in self.stages),
+            'stages': self.stages,
+        }
+
+    def save(self, path=None):
+        """Writes report() as JSON (default data/profiles/profile-<time>.json) and returns the path."""
+        if path is None:
+            os.makedirs(self.out_dir, exist_ok=True)
+            path = os.path.join(self.out_dir, f"profile-{self._created}.json")
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=1, default=str)
+        return path
@@ -0,0 +1,127 @@
+import profiling
+
+# strategy plugin registry
+# each strategy is registered as "module:function" together with the heavy
+# packages it needs; nothing is imported until the strategy is first used, so
+# running only the SMA strategy never loads tensorflow, statsmodels or sklearn.
+# packages a strategy only needs on some paths (the LSTM's tensorflow, only to
+# train) are not imported here but by the strategy itself, so a model store
+# hit is served without them.
+# import_report() shows what was loaded and what it cost.
+
+class StrategySpec:
+    def __init__(self, name, target, requires=(), mode='ticker', description='', lazy=()):
+        """
+        target: "module:function" implementing the strategy
+        requires: heavy packages imported (and timed) before the module
+        lazy: heavy packages the strategy imports itself when it needs them (only reported)
+        mode: 'ticker' = function(prices Series) -> signals frame, one call per ticker
+              'events' = same function, run over the universe by strategies.generate_events
+              'universe' = function(prices DataFrame) -> {ticker: signals frame}
+        """
+        self.name = name
+        self.target = target
+        self.requires = tuple(requires)
+        self.mode = mode
+        self.description = description
+        self.lazy = tuple(lazy)
+        self.fn = None
+
+STRATEGIES = {}
+IMPORT_TIMES = profiling.IMPORT_TIMES # module -> seconds, for heavy imports timed in this process
+
+def register(name, target, requires=(), mode='ticker', description='', lazy=()):
+    STRATEGIES[name] = StrategySpec(name, target, requires, mode, description, lazy)
+    return STRATEGIES[name]
+
+_import = profiling.import_module
+
+def get(name):
+    """The strategy's function, importing its dependencies on first use."""
+    if name not in STRATEGIES:
+        raise KeyError(f"Unknown strategy: {name} (available: {', '.join(STRATEGIES)})")
+    spec = STRATEGIES[name]
+    if spec.fn is None:
+        # the span tells import_report the strategy was loaded, also from a worker
+        with profiling.span(f'load {name}'):
+            for module in spec.requires:
+                _import(module)
+            module, function = spec.target.split(':')
+            spec.fn = getattr(_import(module), function)
+    return spec.fn
+
+def target_modules(names):
+    """Modules the strategies are implemented in, for the scheduler's code= (they are imported by name)."""
+    return sorted({STRATEGIES[name].target.split(':')[0] for name in names})
+
+# entry points for scheduler nodes: they only carry the strategy name, so the
+# heavy imports happen in the worker that runs the strategy
+def run(name, *args, **kwargs):
+    return get(name)(*args, **kwargs)
+
+def run_ticker(name, prices_df, ticker, **kwargs):
+    return get(name)(prices_df[ticker].dropna(), **kwargs)
+
+def run_events(name, prices_df, **kwargs):
+    fn = get(name)
+    import strategies
+    return strategies.generate_events(prices_df, fn, **kwargs)
+
+def run_block(names, prices_df, tickers=None, params=None):
+    """
+    Signals of 'events' / 'universe' strategies for one block of tickers (all
+    of prices_df by default), as {name: signals}. The 'events' ones go through
+    the block ticker by ticker together, so they share indicators.CACHE (SMA
+    and Hybrid both use the 20 / 50 bar means); a 'universe' one gets the block.
+    params: {name: kwargs}
+    """
+    if tickers is not None:
+        prices_df = prices_df[list(tickers)]
+    params = params or {}
+    fns = {name: get(name) for name in names}
+    grouped = {name: fn for name, fn in fns.items() if STRATEGIES[name].mode == 'events'}
+    out = {}
+    if grouped:
+        import strategies
+        out.update(strategies.generate_events_group(prices_df, grouped, params))
+    for name, fn in fns.items():
+        if name not in grouped:
+            out[name] = fn(prices_df, **params.get(name, {}))
+    return out
+
+def import_report(spans=None):
+    """
+    Which strategies were loaded and how long their imports took.
+    spans: profiling.span() timings of the run, e.g. of every task in a
+           Scheduler's details, so loads and imports done in worker processes
+           count too (an import paid by several workers is summed); None
+           reports on this process only
+    """
+    if spans is None:
+        loaded = {name for name, spec in STRATEGIES.items() if spec.fn is not None}
+        times = IMPORT_TIMES
+    else:
+        loaded, times = set(), {}
+        for label, seconds in spans:
+            kind, _, what = label.partition(' ')
+            if kind == 'load':
+                loaded.add(what)
+            elif kind == 'import':
+                times[what] = times.get(what, 0.0) + seconds
+    lines = []
+    for spec in STRATEGIES.values():
+        modules = list(spec.requires) + list(spec.lazy) + [spec.target.split(':')[0]]
+        state = 'loaded' if spec.name in loaded else 'not loaded'
+        cost = sum(times.get(m, 0.0) for m in modules)
+        needs = ', '.join(list(spec.requires) + [f'{m} (lazy)' for m in spec.lazy]) or '-'
+        lines.append(f"{spec.name:<8} {state:<11} {cost:6.2f}s  requires: {needs}")
+    return '\n'.join(lines)
+
+register('SMA', 'strategies:generate_sma_signals', mode='events',
+         description='moving average crossover')
+register('Hybrid', 'strategies:generate_hybrid_signals', mode='events',
+         description='moving average crossover filtered by RSI < 70')
+register('ARIMA', 'arima_batch:generate_arima_batch_signals', requires=('statsmodels.api',), mode='universe',
+         description='batched ARIMA next-bar forecast')
+register('LSTM', 'strategies:run_lstm_strategy', lazy=('tensorflow', 'sklearn.preprocessing'),
+         description='LSTM next-bar forecast')
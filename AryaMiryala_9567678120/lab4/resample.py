@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+# on-the-fly resampling of a base bar series (e.g. 1m closes from the price
+# store) to coarser bars, working directly on the int64 ns timestamps
+# nothing is stored per frequency: each call buckets the base series with one
+# integer division and reduces every bucket with np.*.reduceat
+
+NS_PER_MINUTE = 60 * 1_000_000_000
+
+# bar size in minutes for the intervals yfinance / the store use
+INTERVAL_MINUTES = {
+    '1m': 1, '2m': 2, '5m': 5, '15m': 15, '30m': 30, '60m': 60, '90m': 90,
+    '1h': 60, '1d': 24 * 60,
+}
+
+TRADING_DAYS = 252
+TRADING_MINUTES_PER_DAY = 390 # 9:30 - 16:00
+
+# bars per year for the intervals that are not a fixed number of minutes
+PERIODS_PER_YEAR = {'1d': TRADING_DAYS, '5d': TRADING_DAYS / 5, '1wk': 52, '1mo': 12, '3mo': 4}
+
+def periods_per_year(interval):
+    """Bars per year for annualizing (Sharpe etc.), e.g. 252 for '1d', 252 * 78 for '5m'."""
+    if interval in PERIODS_PER_YEAR:
+        return PERIODS_PER_YEAR[interval]
+    return TRADING_DAYS * TRADING_MINUTES_PER_DAY / INTERVAL_MINUTES[interval]
+
+def bucket_bounds(ts, rule):
+    """
+    Start index of every `rule` bucket in sorted int64 ns timestamps, and the
+    bucket start times. Buckets are aligned to multiples of the bar size
+    (UTC midnight for '1d').
+    """
+    step = INTERVAL_MINUTES[rule] * NS_PER_MINUTE
+    buckets = np.asarray(ts) // step
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1)) if len(buckets) else np.zeros(0, dtype=np.int64)
+    return starts, buckets[starts] * step
+
+def resample_ohlc(ts, close, rule):
+    """
+    Bars of size `rule` built from base closes.
+    Returns a DataFrame indexed by bar start with open/high/low/close columns.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    starts, bar_ts = bucket_bounds(ts, rule)
+    if len(starts) == 0:
+        return pd.DataFrame(columns=['open', 'high', 'low', 'close'], dtype=float)
+
+    ends = np.concatenate((starts[1:], [len(close)])) - 1
+    return pd.DataFrame({
+        'open': close[starts],
+        'high': np.maximum.reduceat(close, starts),
+        'low': np.minimum.reduceat(close, starts),
+        'close': close[ends],
+    }, index=pd.DatetimeIndex(bar_ts.astype('datetime64[ns]'), name='Date'))
+
+def resample_close(prices, rule):
+    """
+    Close-only resampling of a Series (DatetimeIndex) or wide DataFrame,
+    the same shape fetch_data returns, so strategies can run on it directly.
+    """
+    if isinstance(prices, pd.DataFrame):
+        cols = {t: resample_close(prices[t].dropna(), rule) for t in prices.columns}
+        return pd.DataFrame(cols)
+
+    ts = prices.index.values.astype('datetime64[ns]').astype(np.int64)
+    starts, bar_ts = bucket_bounds(ts, rule)
+    ends = np.concatenate((starts[1:], [len(ts)])) - 1 if len(starts) else starts
+    index = pd.DatetimeIndex(bar_ts.astype('datetime64[ns]'), name='Date')
+    return pd.Series(prices.to_numpy()[ends], index=index, name=prices.name)
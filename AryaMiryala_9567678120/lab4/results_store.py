@@ -0,0 +1,195 @@
+import os
+import json
+import hashlib
+import time
+import numpy as np
+import pandas as pd
+
+import ledger
+import metrics
+
+# persistent store of backtest results
+# every run (strategy + params + data fingerprint) gets a folder with its
+# equity curve and fill log as .npy columns plus a meta.json; one index.npz
+# holds a column per field / metric for all runs, so ranking or filtering
+# thousands of runs is a single small load and no backtest is recomputed
+#
+#   data/results/index.npz
+#   data/results/runs/<run_id>/timestamp.npy   int64 ns
+#                             /equity.npy      float64 total value
+#                             /cash.npy        float64
+#                             /fills.npy       ledger.FILL_DTYPE
+#                             /meta.json       strategy, params, fingerprint, tickers, metrics
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'results')
+
+INDEX_FIELDS = ['run_id', 'strategy', 'params', 'fingerprint', 'created']
+
+def run_key(strategy, params, fingerprint):
+    """Run id: hash of the strategy, its params (as sorted JSON) and the data fingerprint."""
+    text = json.dumps([strategy, params or {}, fingerprint], sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+class ResultsStore:
+    def __init__(self, root=RESULTS_DIR):
+        self.root = root
+        self._index = None
+
+    def _dir(self, run_id):
+        return os.path.join(self.root, 'runs', run_id)
+
+    def index(self):
+        """All stored runs, one row each: id fields plus every metric column."""
+        if self._index is None:
+            path = os.path.join(self.root, 'index.npz')
+            if os.path.exists(path):
+                with np.load(path) as cols:
+                    self._index = pd.DataFrame({name: cols[name] for name in cols.files})
+            else:
+                self._index = pd.DataFrame(columns=INDEX_FIELDS)
+        return self._index
+
+    def _write_index(self, rows):
+        index = self.index()
+        new = pd.DataFrame(rows)
+        self._save_index(pd.concat([index[~index['run_id'].isin(new['run_id'])], new], ignore_index=True))
+
+    def _save_index(self, index):
+        os.makedirs(self.root, exist_ok=True)
+        cols = {}
+        for name in index.columns:
+            if name in INDEX_FIELDS:
+                # fixed-width unicode, so loading never needs pickle
+                cols[name] = np.array([str(v) for v in index[name]], dtype=str)
+            else:
+                cols[name] = index[name].to_numpy(dtype=np.float64)
+        # temp file first so readers never see a half-written index
+        tmp = os.path.join(self.root, 'index.tmp.npz')
+        np.savez(tmp, **cols)
+        os.replace(tmp, os.path.join(self.root, 'index.npz'))
+        self._index = index.reset_index(drop=True)
+
+    def has(self, strategy, params, fingerprint):
+        """Run id if this exact run is stored already, else None."""
+        run_id = run_key(strategy, params, fingerprint)
+        return run_id if (self.index()['run_id'] == run_id).any() else None
+
+    def _write_run(self, run_id, meta, dates, equity, cash=None, fills=None):
+        folder = self._dir(run_id)
+        os.makedirs(folder, exist_ok=True)
+        columns = {'timestamp': dates, 'equity': equity}
+        if cash is not None:
+            columns['cash'] = cash
+        if fills is not None:
+            columns['fills'] = fills
+        for name, arr in columns.items():
+            tmp = os.path.join(folder, f'{name}.tmp.npy')
+            np.save(tmp, arr)
+            os.replace(tmp, os.path.join(folder, f'{name}.npy'))
+        with open(os.path.join(folder, 'meta.json'), 'w') as f:
+            json.dump(meta, f, default=str)
+
+    def save(self, strategy, params, fingerprint, result, initial_capital=None, periods_per_year=252):
+        """
+        Stores one run and returns its id (an existing run with the same key is replaced).
+        result: ledger.Ledger (equity, cash and fills are kept) or an equity
+                Series / single-column DataFrame indexed by date
+        initial_capital: base for total return / CAGR (None = first value)
+        """
+        return self.save_many(strategy, [(params, result)], fingerprint, initial_capital, periods_per_year)[0]
+
+    def save_many(self, strategy, runs, fingerprint, initial_capital=None, periods_per_year=252):
+        """
+        Stores many runs of one strategy on the same data with a single index
+        write, e.g. a parameter sweep. runs: [(params, result), ...]
+        """
+        rows, run_ids = [], []
+        for params, result in runs:
+            run_id = run_key(strategy, params, fingerprint)
+            cash, fills, tickers = None, None, []
+            if isinstance(result, ledger.Ledger):
+                bars = result.equity[:result.n_bars]
+                dates, equity, cash = bars['date'].copy(), bars['value'].copy(), bars['cash'].copy()
+                fills, tickers = result.fills[:result.n_fills].copy(), list(map(str, result.tickers))
+            else:
+                series = result.iloc[:, 0] if isinstance(result, pd.DataFrame) else result
+                dates = pd.DatetimeIndex(series.index).as_unit('ns').asi8
+                equity = series.to_numpy(dtype=np.float64)
+
+            table = metrics.equity_metrics(equity[None, :], initial_capital, periods_per_year)
+            row_metrics = {k: float(v) for k, v in table.iloc[0].items()}
+            row_metrics['n_fills'] = float(len(fills)) if fills is not None else np.nan
+            created = time.strftime('%Y-%m-%dT%H:%M:%S')
+            meta = {
+                'run_id': run_id, 'strategy': strategy, 'params': params or {},
+                'fingerprint': fingerprint, 'created': created, 'tickers': tickers,
+                'metrics': row_metrics,
+            }
+            self._write_run(run_id, meta, dates, equity, cash, fills)
+
+            rows.append({
+                'run_id': run_id, 'strategy': strategy,
+                'params': json.dumps(params or {}, sort_keys=True, default=str),
+                'fingerprint': fingerprint, 'created': created, **row_metrics,
+            })
+            run_ids.append(run_id)
+
+        self._write_index(rows)
+        return run_ids
+
+    def query(self, strategy=None, fingerprint=None, params=None, where=None):
+        """
+        Stored runs matching every given filter, from the index only.
+        params: {name: value} that must all match the run's params
+        where: extra boolean filter on the index, e.g. lambda df: df.sharpe > 1
+        The params column comes back parsed into dicts.
+        """
+        df = self.index()
+        if strategy is not None:
+            df = df[df['strategy'] == strategy]
+        if fingerprint is not None:
+            df = df[df['fingerprint'] == fingerprint]
+        df = df.assign(params=df['params'].map(json.loads))
+        if params:
+            df = df[df['params'].map(lambda p: all(p.get(k) == v for k, v in params.items()))]
+        if where is not None:
+            df = df[where(df)]
+        return df
+
+    def rank(self, by='sharpe', ascending=False, top=None, **filters):
+        """Best stored runs by one metric; filters go to query()."""
+        return metrics.rank(self.query(**filters), by, ascending, top)
+
+    def load(self, run_id, mmap=True):
+        """(equity Series, fills DataFrame, meta dict) of one run, columns memory-mapped."""
+        folder = self._dir(run_id)
+        with open(os.path.join(folder, 'meta.json')) as f:
+            meta = json.load(f)
+        mode = 'r' if mmap else None
+        ts = np.load(os.path.join(folder, 'timestamp.npy'), mmap_mode=mode)
+        equity = np.load(os.path.join(folder, 'equity.npy'), mmap_mode=mode)
+        index = pd.DatetimeIndex(np.asarray(ts).view('datetime64[ns]'), name='Date')
+        series = pd.Series(np.asarray(equity), index=index, name=run_id)
+
+        fills_path = os.path.join(folder, 'fills.npy')
+        fills = pd.DataFrame()
+        if os.path.exists(fills_path):
+            fills = ledger.fills_to_frame(np.load(fills_path), meta['tickers'])
+        return series, fills, meta
+
+    def curves(self, run_ids):
+        """Equity curves of several runs side by side (outer-joined on date)."""
+        return pd.concat([self.load(run_id)[0] for run_id in run_ids], axis=1)
+
+    def compare(self, run_ids):
+        """Stored metrics of the given runs next to each other, in the given order."""
+        return self.query().set_index('run_id').loc[list(run_ids)]
+
+    def delete(self, run_id):
+        folder = self._dir(run_id)
+        if os.path.isdir(folder):
+            for name in os.listdir(folder):
+                os.remove(os.path.join(folder, name))
+            os.rmdir(folder)
+        index = self.index()
+        self._save_index(index[index['run_id'] != run_id])
@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+import backtester
+import crossover
+import metrics
+import sweep
+
+# monte carlo / bootstrap robustness checks
+# a strategy is re-run on thousands of alternative price histories built from
+# the real one (block-bootstrapped returns, or GBM with the same drift and
+# covariance) and scored on every path, giving a distribution of the
+# calculate_metrics outputs instead of a single number.
+# every path is a separate Portfolio in one backtester.simulate_batch call, and
+# chunks of paths are spread over a process pool
+
+CHUNK_PATHS = 1000 # paths per worker task
+
+def _log_returns(price_df):
+    # (dates - 1, tickers) log returns over the dates every ticker trades
+    prices = price_df.dropna().to_numpy(dtype=np.float64)
+    return prices[0], np.diff(np.log(prices), axis=0)
+
+def _rebuild(first, log_ret):
+    # (paths, dates - 1, tickers) log returns -> (paths, dates, tickers) prices
+    n_paths, n_rets, n_tickers = log_ret.shape
+    paths = np.empty((n_paths, n_rets + 1, n_tickers))
+    paths[:, 0] = first
+    paths[:, 1:] = first * np.exp(np.cumsum(log_ret, axis=1))
+    return paths
+
+def bootstrap_paths(price_df, n_paths, block_size=20, seed=None):
+    """
+    Circular block bootstrap of the daily log returns.
+    Blocks of `block_size` consecutive days are drawn for all tickers together,
+    so autocorrelation inside a block and the cross-correlation between tickers
+    survive. Rows with any NaN are dropped first.
+    Returns a (paths, dates, tickers) price array starting at the real first price.
+    """
+    rng = np.random.default_rng(seed)
+    first, log_ret = _log_returns(price_df)
+    n_rets = len(log_ret)
+
+    n_blocks = -(-n_rets // block_size)
+    starts = rng.integers(0, n_rets, size=(n_paths, n_blocks))
+    rows = (starts[:, :, None] + np.arange(block_size)).reshape(n_paths, -1)[:, :n_rets] % n_rets
+    return _rebuild(first, log_ret[rows])
+
+def gbm_paths(price_df, n_paths, seed=None):
+    """
+    Correlated geometric brownian motion with the drift and covariance of the
+    real log returns. Returns a (paths, dates, tickers) price array.
+    """
+    rng = np.random.default_rng(seed)
+    first, log_ret = _log_returns(price_df)
+    mean = log_ret.mean(axis=0)
+    cov = np.atleast_2d(np.cov(log_ret, rowvar=False))
+    draws = rng.multivariate_normal(mean, cov, size=(n_paths, len(log_ret)), method='cholesky')
+    return _rebuild(first, draws)
+
+def path_positions(paths, strategy='sma', short_window=20, long_window=50, rsi_period=14):
+    """
+    'positions' of generate_sma_signals / generate_hybrid_signals for every
+    path and ticker at once, as a (paths, dates, tickers) int8 array.
+    """
+    n_paths, n_dates, n_tickers = paths.shape
+    wide = paths.transpose(1, 0, 2).reshape(n_dates, -1)
+
+    if strategy == 'sma':
+        short, long = sweep.rolling_means(wide, [short_window, long_window], min_periods=1)
+        signal = short > long
+    elif strategy == 'hybrid':
+        short, long = sweep.rolling_means(wide, [short_window, long_window])
+        rsi = sweep.rolling_rsi(wide, [rsi_period])[0]
+        signal = (short > long) & (rsi < 70)
+    else:
+        raise ValueError(f"Unknown strategy: {strategy}")
+
+    signal[:short_window] = False
+    positions = crossover.regime_changes(signal, axis=0)
+    return positions.reshape(n_dates, n_paths, n_tickers).transpose(1, 0, 2)
+
+def _simulate_chunk(args):
+    paths, strategy, params, initial_capital, transaction_cost = args
+    if callable(strategy):
+        positions = strategy(paths, **params)
+    else:
+        positions = path_positions(paths, strategy, **params)
+    values, _, _ = backtester.simulate_batch(paths, positions, initial_capital, transaction_cost)
+    return values
+
+def simulate_paths(paths, strategy='sma', initial_capital=100000.0, transaction_cost=5.00, n_jobs=None, **params):
+    """
+    Backtests a strategy on every path with the Portfolio rules.
+    paths: (paths, dates, tickers) prices, e.g. from bootstrap_paths
+    strategy: 'sma' / 'hybrid' (params go to path_positions), or a function
+              taking (paths, **params) and returning positions of the same shape
+    n_jobs: worker processes (1 = run here, None = one per core)
+    Returns the (paths, dates) equity curves.
+    """
+    tasks = [
+        (paths[i:i + CHUNK_PATHS], strategy, params, initial_capital, transaction_cost)
+        for i in range(0, len(paths), CHUNK_PATHS)
+    ]
+    if n_jobs == 1 or len(tasks) == 1:
+        results = [_simulate_chunk(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            results = list(pool.map(_simulate_chunk, tasks))
+    return np.concatenate(results)
+
+def robustness_test(price_df, strategy='sma', n_paths=10000, method='bootstrap', block_size=20,
+                    initial_capital=100000.0, transaction_cost=5.00, periods_per_year=252,
+                    seed=None, n_jobs=None, **params):
+    """
+    Distribution of total_return / sharpe / final_value (plus the rest of
+    metrics.equity_metrics) for a strategy over n_paths simulated histories.
+    method: 'bootstrap' (block bootstrap) or 'gbm'
+    Returns a DataFrame with one row per path.
+    """
+    if method == 'bootstrap':
+        paths = bootstrap_paths(price_df, n_paths, block_size, seed)
+    elif method == 'gbm':
+        paths = gbm_paths(price_df, n_paths, seed)
+    else:
+        raise ValueError(f"Unknown method: {method}")
+
+    values = simulate_paths(paths, strategy, initial_capital, transaction_cost, n_jobs, **params)
+    return metrics.equity_metrics(values, initial_capital, periods_per_year)
+
+def summarize(distribution, observed=None, columns=('total_return', 'sharpe', 'final_value')):
+    """
+    Percentiles of each metric across paths. With observed={metric: value}
+    (e.g. the real backtest's Sharpe) adds the share of paths that did at
+    least as well, i.e. how often luck alone gets there.
+    """
+    summary = distribution[list(columns)].quantile([0.05, 0.25, 0.5, 0.75, 0.95]).T
+    summary['mean'] = distribution[list(columns)].mean()
+    if observed:
+        summary['p_at_least_observed'] = pd.Series({
+            col: float((distribution[col] >= value).mean()) for col, value in observed.items()
+        })
+    return summary
@@ -0,0 +1,328 @@
+import ast
+import hashlib
+import inspect
+import multiprocessing
+import os
+import pickle
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+import profiling
+
+# small dependency-graph scheduler for the lab4 pipeline
+# every step (signals for a strategy, an LSTM for one ticker, a backtest) is a
+# node; nodes whose inputs are ready run in parallel on a process pool, big
+# price frames reach the workers through shared memory, and every result is
+# cached on disk under a key built from the function, its code, its arguments
+# and the keys of its dependencies, so a re-run only recomputes the nodes whose
+# inputs (or code) changed and everything downstream of them
+# a node's code is the source of its function's module and of every local
+# module that one imports, directly or not (imports inside functions count),
+# so editing indicators.py re-runs the strategies that use it; code loaded by
+# name (the registry's strategies) is declared with add(..., code=[modules])
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'tasks')
+
+class SharedFrame:
+    """
+    A price DataFrame whose values live in a shared memory block.
+    Pickling it (e.g. as a task argument) only sends the block name, shape,
+    index and columns; workers map the same memory with frame().
+    The frame handed out is shared by every process, treat it as read-only.
+    """
+
+    def __init__(self, df):
+        values = np.ascontiguousarray(df.to_numpy(dtype=np.float64))
+        self.shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        np.ndarray(values.shape, dtype=np.float64, buffer=self.shm.buf)[:] = values
+        self.name = self.shm.name
+        self.shape = values.shape
+        self.index = df.index
+        self.columns = df.columns
+        self.key = data_loader.fingerprint(df)
+        self.owner = True
+        self._frame = None
+
+    def __getstate__(self):
+        return {'name': self.name, 'shape': self.shape, 'index': self.index,
+                'columns': self.columns, 'key': self.key}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.shm = None
+        self.owner = False
+        self._frame = None
+
+    def frame(self):
+        if self._frame is None:
+            if self.shm is None:
+                self.shm = shared_memory.SharedMemory(name=self.name)
+            values = np.ndarray(self.shape, dtype=np.float64, buffer=self.shm.buf)
+            self._frame = pd.DataFrame(values, index=self.index, columns=self.columns, copy=False)
+        return self._frame
+
+    def close(self):
+        """Frees the block (owner only, call once every worker is done)."""
+        self._frame = None
+        if self.owner and self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Task:
+    def __init__(self, name, fn, args, kwargs, deps, cache, code=()):
+        """
+        deps: {parameter name: node name, list of node names or {key: node name}},
+              the finished results are passed to fn under that parameter
+        code: names of local modules fn runs without importing them itself
+        """
+        self.name = name
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.deps = deps
+        self.cache = cache
+        self.code = tuple(code)
+
+    def dep_names(self):
+        names = []
+        for dep in self.deps.values():
+            if isinstance(dep, str):
+                names.append(dep)
+            elif isinstance(dep, dict):
+                names.extend(dep.values())
+            else:
+                names.extend(dep)
+        return names
+
+def _token(value):
+    # stable text for a cache key
+    if isinstance(value, SharedFrame):
+        return value.key
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return data_loader.fingerprint(value)
+    if isinstance(value, (list, tuple)):
+        return '[' + ','.join(_token(v) for v in value) + ']'
+    if isinstance(value, dict):
+        return '{' + ','.join(f'{k}:{_token(v)}' for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))) + '}'
+    return hashlib.sha1(pickle.dumps(value)).hexdigest()
+
+_sources = {} # file -> (source, files of the local modules it imports)
+
+def _read_source(path):
+    if path not in _sources:
+        with open(path, 'rb') as f:
+            source = f.read()
+        names = set()
+        for node in ast.walk(ast.parse(source)):
+            if isinstance(node, ast.Import):
+                names.update(alias.name.split('.')[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names.add(node.module.split('.')[0])
+        folder = os.path.dirname(path)
+        local = [os.path.join(folder, f'{name}.py') for name in sorted(names)]
+        _sources[path] = source, [p for p in local if os.path.exists(p)]
+    return _sources[path]
+
+def _code_hash(fn, modules=()):
+    # source of fn's module, of the local `modules` next to it and of every
+    # local module any of those imports
+    try:
+        path = os.path.abspath(inspect.getsourcefile(fn))
+    except TypeError:
+        return ''
+    folder = os.path.dirname(path)
+    todo = [path] + [os.path.join(folder, f'{m}.py') for m in modules]
+    seen = set()
+    while todo:
+        p = todo.pop()
+        if p not in seen:
+            seen.add(p)
+            todo.extend(_read_source(p)[1])
+    h = hashlib.sha1()
+    for p in sorted(seen):
+        h.update(os.path.basename(p).encode())
+        h.update(_read_source(p)[0])
+    return h.hexdigest()
+
+def _file_name(name):
+    return re.sub(r'[^\w.-]', '_', name)
+
+def _resolve(value):
+    if isinstance(value, SharedFrame):
+        return value.frame()
+    return value
+
+def _run_task(fn, args, kwargs):
+    # runs in the worker; profiling.span() timings inside fn come back with the result
+    start = time.perf_counter()
+    with profiling.collect() as spans, profiling.track_peak_rss() as peak:
+        result = fn(*[_resolve(a) for a in args], **{k: _resolve(v) for k, v in kwargs.items()})
+    seconds = time.perf_counter() - start
+    return result, seconds, {'spans': spans, **peak}
+
+class Scheduler:
+    def __init__(self, n_jobs=None, cache_dir=CACHE_DIR):
+        """
+        n_jobs: worker processes (1 = run everything here, None = one per core)
+        cache_dir: where node results are kept between runs (None = no cache)
+        """
+        self.n_jobs = n_jobs
+        self.cache_dir = cache_dir
+        self.tasks = {}
+        self.stats = {}
+        self.details = {}
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def add(self, name, fn, *args, deps=None, cache=True, code=(), **kwargs):
+        """
+        Adds node `name` computing fn(*args, **kwargs, **dependency results).
+        Args can be SharedFrame handles, workers get the frame itself.
+        code: local modules (by name) fn uses without importing them, part of the cache key
+        Returns name, so it can be used in later deps.
+        """
+        if name in self.tasks:
+            raise ValueError(f"Duplicate task: {name}")
+        self.tasks[name] = Task(name, fn, args, kwargs, deps or {}, cache, code)
+        return name
+
+    def _order(self):
+        # topological order, dependencies first
+        order, state = [], {}
+
+        def visit(name, path):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+            if name not in self.tasks:
+                raise KeyError(f"Unknown dependency: {name}")
+            state[name] = 'visiting'
+            for dep in self.tasks[name].dep_names():
+                visit(dep, path + [name])
+            state[name] = 'done'
+            order.append(name)
+
+        for name in self.tasks:
+            visit(name, [])
+        return order
+
+    def _keys(self, order):
+        keys = {}
+        for name in order:
+            task = self.tasks[name]
+            h = hashlib.sha1()
+            h.update(f'{task.fn.__module__}.{task.fn.__qualname__}'.encode())
+            h.update(_code_hash(task.fn, task.code).encode())
+            h.update(_token(list(task.args)).encode())
+            h.update(_token(task.kwargs).encode())
+            for dep in task.dep_names():
+                h.update(keys[dep].encode())
+            keys[name] = h.hexdigest()[:16]
+        return keys
+
+    def _cache_path(self, name, key):
+        return os.path.join(self.cache_dir, f"{_file_name(name)}-{key}.pkl")
+
+    def _load(self, task, key):
+        if self.cache_dir is None or not task.cache:
+            return False, None
+        path = self._cache_path(task.name, key)
+        if not os.path.exists(path):
+            return False, None
+        with open(path, 'rb') as f:
+            return True, pickle.load(f)
+
+    def _save(self, task, key, result):
+        if self.cache_dir is None or not task.cache:
+            return
+        prefix = _file_name(task.name) + '-'
+        for old in os.listdir(self.cache_dir):
+            # <name>-<16 hex key>.pkl, so 'a' does not match files of 'a-b'
+            if old.startswith(prefix) and old.endswith('.pkl') and len(old) == len(prefix) + 20:
+                os.remove(os.path.join(self.cache_dir, old))
+        with open(self._cache_path(task.name, key), 'wb') as f:
+            pickle.dump(result, f)
+
+    def _call(self, task, results):
+        kwargs = dict(task.kwargs)
+        for param, dep in task.deps.items():
+            if isinstance(dep, str):
+                kwargs[param] = results[dep]
+            elif isinstance(dep, dict):
+                kwargs[param] = {k: results[d] for k, d in dep.items()}
+            else:
+                kwargs[param] = [results[d] for d in dep]
+        return task.fn, task.args, kwargs
+
+    def run(self):
+        """
+        Runs the graph and returns {node name: result}.
+        self.stats gets {node name: ('cached' | 'ran', seconds)}, self.details
+        {node name: {'spans': profiling.span() timings, 'peak_rss_mb': peak RSS while it ran}}
+        for the nodes that ran.
+        """
+        order = self._order()
+        keys = self._keys(order)
+        results, self.stats, self.details = {}, {}, {}
+        remaining = {name: set(self.tasks[name].dep_names()) for name in order}
+
+        def ready():
+            return [n for n in order if n in remaining and not remaining[n] and n not in running]
+
+        def finish(name, result, status, seconds, detail=None):
+            results[name] = result
+            self.stats[name] = (status, seconds)
+            if detail is not None:
+                self.details[name] = detail
+            del remaining[name]
+            for deps in remaining.values():
+                deps.discard(name)
+
+        running = {}
+        pool = None
+        # spawned workers: tensorflow / BLAS thread pools do not survive a fork
+        if self.n_jobs != 1:
+            pool = ProcessPoolExecutor(max_workers=self.n_jobs, mp_context=multiprocessing.get_context('spawn'))
+        try:
+            while remaining:
+                for name in ready():
+                    task = self.tasks[name]
+                    hit, result = self._load(task, keys[name])
+                    if hit:
+                        finish(name, result, 'cached', 0.0)
+                    elif pool is None:
+                        result, seconds, detail = _run_task(*self._call(task, results))
+                        self._save(task, keys[name], result)
+                        finish(name, result, 'ran', seconds, detail)
+                    else:
+                        running[name] = pool.submit(_run_task, *self._call(task, results))
+
+                if not running:
+                    continue
+                done, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+                for name in [n for n, fut in running.items() if fut in done]:
+                    result, seconds, detail = running.pop(name).result()
+                    self._save(self.tasks[name], keys[name], result)
+                    finish(name, result, 'ran', seconds, detail)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        return results
+
+    def report(self):
+        """One line per node: status and seconds spent in the worker."""
+        return '\n'.join(f"{name:<20} {status:<7} {seconds:8.2f}s" for name, (status, seconds) in self.stats.items())
@@ -1,16 +1,24 @@
 import pandas as pd
 import numpy as np
-from statsmodels.tsa.arima.model import ARIMA
-from sklearn.preprocessing import MinMaxScaler
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense
+from concurrent.futures import ProcessPoolExecutor
+from numpy.lib.stride_tricks import sliding_window_view
+
+import data_loader
+import indicators
+import crossover
+import events
+import lstm_numpy
+import profiling
+
+# statsmodels, scikit-learn and tensorflow are imported inside the ARIMA / LSTM
+# functions, so the sma and hybrid strategies load without them (see registry.py)
 
 # sma
 def generate_sma_signals(prices, short_window=20, long_window=50):
     signals = pd.DataFrame(index=prices.index)
     signals['price'] = prices
-    signals['short_mavg'] = prices.rolling(window=short_window, min_periods=1).mean()
-    signals['long_mavg'] = prices.rolling(window=long_window, min_periods=1).mean()
+    signals['short_mavg'] = indicators.rolling_mean(prices, short_window, min_periods=1)
+    signals['long_mavg'] = indicators.rolling_mean(prices, long_window, min_periods=1)
     
     signals['signal'] = 0.0
     
@@ -26,19 +34,54 @@ def generate_sma_signals(prices, short_window=20, long_window=50):
     signals['positions'] = signals['signal'].diff()
     return signals
 
+def sma_crossover_events(prices_df, short_window=20, long_window=50):
+    """
+    Classic crossover events (1 buy / -1 sell / 0) for a whole (dates, tickers)
+    price DataFrame in one vectorized pass, same rule as legacy mov_avg_alg.
+    """
+    short_mavg = prices_df.rolling(window=short_window).mean()
+    long_mavg = prices_df.rolling(window=long_window).mean()
+    events = crossover.crossover_events(short_mavg.to_numpy(), long_mavg.to_numpy())
+    return pd.DataFrame(events, index=prices_df.index, columns=prices_df.columns)
+
+def generate_events(prices_df, signal_fn=None, **params):
+    """
+    Runs a per-ticker strategy (generate_sma_signals by default) over every
+    column of prices_df and keeps only its buy / sell events, as an
+    events.SignalEvents on prices_df.index. Each ticker's full signals frame
+    is dropped as soon as its events are taken, so memory stays at one frame.
+    params go to signal_fn, e.g. short_window=10.
+    """
+    signal_fn = generate_sma_signals if signal_fn is None else signal_fn
+    return generate_events_group(prices_df, {'': signal_fn}, {'': params})['']
+
+def generate_events_group(prices_df, signal_fns, params=None):
+    """
+    generate_events for several strategies ({name: signal_fn}) in one pass:
+    each ticker's series goes through all of them in turn, so indicators they
+    share (the 20 / 50 bar means of SMA and hybrid) are computed once.
+    params: {name: kwargs for that signal_fn}
+    Returns {name: events.SignalEvents}.
+    """
+    params = params or {}
+    positions = {name: {} for name in signal_fns}
+    for ticker in prices_df.columns:
+        prices = prices_df[ticker].dropna()
+        for name, signal_fn in signal_fns.items():
+            with profiling.span(f'{name} {ticker}'.strip()):
+                pos = signal_fn(prices, **params.get(name, {}))[['positions']]
+            positions[name][ticker] = pos[pos['positions'].abs() == 1.0]
+    return {name: events.SignalEvents.from_signals(pos, prices_df.index) for name, pos in positions.items()}
+
 # hybrid strategy (sma + rsi) 
 def generate_hybrid_signals(prices, short_window=20, long_window=50, rsi_period=14):
     signals = pd.DataFrame(index=prices.index)
     signals['price'] = prices
-    signals['short_mavg'] = prices.rolling(window=short_window).mean()
-    signals['long_mavg'] = prices.rolling(window=long_window).mean()
+    signals['short_mavg'] = indicators.rolling_mean(prices, short_window)
+    signals['long_mavg'] = indicators.rolling_mean(prices, long_window)
     
     # rsi calculation
-    delta = prices.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=rsi_period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=rsi_period).mean()
-    rs = gain / loss
-    signals['rsi'] = 100 - (100 / (1 + rs))
+    signals['rsi'] = indicators.rsi(prices, rsi_period)
     
     signals['signal'] = 0.0
     
@@ -53,10 +96,20 @@ def generate_hybrid_signals(prices, short_window=20, long_window=50, rsi_period=
     return signals
 
 # arima
-def generate_arima_signals(prices, order=(5,1,0)):
+def generate_arima_signals(prices, order=(5,1,0), walk_forward=False, warmup=250, refit_every=None):
+    """
+    walk_forward=False fits once on the whole history and trades on the
+    in-sample fitted values. walk_forward=True fits on the first `warmup`
+    bars and trades on out-of-sample one-step forecasts instead, refitting
+    every `refit_every` bars (None = never).
+    """
+    if walk_forward:
+        return _arima_walk_forward_signals(prices, order, warmup, refit_every)
+
     signals = pd.DataFrame(index=prices.index)
     signals['price'] = prices
     history = list(prices.values)
+    from statsmodels.tsa.arima.model import ARIMA
     
     try:
         model = ARIMA(history, order=order)
@@ -65,48 +118,104 @@ def generate_arima_signals(prices, order=(5,1,0)):
         
         signals['signal'] = np.where(signals['predicted_price'] > signals['price'], 1.0, 0.0)
         signals['positions'] = signals['signal'].diff()
-    except:
-        print("ARIMA convergence failed, returning empty signals")
+    except Exception as e:
+        print(f"ARIMA convergence failed ({e}), returning empty signals")
         signals['positions'] = 0.0
         
     return signals
 
+def _arima_walk_forward_signals(prices, order, warmup, refit_every):
+    signals = pd.DataFrame(index=prices.index)
+    signals['price'] = prices
+    values = prices.to_numpy(dtype=np.float64)
+    n = len(values)
+
+    if n <= warmup:
+        signals['positions'] = 0.0
+        return signals
+
+    from statsmodels.tsa.arima.model import ARIMA
+
+    # forecast[t] is the prediction of values[t] made with values[:t] only
+    forecast = np.full(n + 1, np.nan)
+    try:
+        model_fit = ARIMA(values[:warmup], order=order).fit()
+        t = warmup
+        while t < n:
+            stop = n if not refit_every else min(t + refit_every, n)
+            # extend() runs the filter over the new bars with the current params,
+            # so its fitted values are exactly the one-step forecasts
+            model_fit = model_fit.extend(values[t:stop])
+            forecast[t:stop] = model_fit.fittedvalues
+            t = stop
+            if refit_every and t < n:
+                model_fit = ARIMA(values[:t], order=order).fit(start_params=model_fit.params)
+        forecast[n] = model_fit.forecast(1)[0]
+    except Exception as e:
+        print(f"ARIMA walk-forward failed ({e}), returning empty signals")
+        signals['positions'] = 0.0
+        return signals
+
+    # on day t we only know the forecast for t+1
+    signals['predicted_price'] = forecast[1:]
+    signals['signal'] = np.where(signals['predicted_price'] > signals['price'], 1.0, 0.0)
+    signals['positions'] = signals['signal'].diff()
+    return signals
+
+def _arima_ticker_signals(args):
+    prices, kwargs = args
+    return generate_arima_signals(prices, **kwargs)
+
+def generate_arima_universe(prices_df, n_jobs=None, **kwargs):
+    """
+    Runs generate_arima_signals for every ticker across a process pool.
+    kwargs are passed through (e.g. walk_forward=True, refit_every=20).
+    Returns {ticker: signals_dataframe}.
+    """
+    tickers = list(prices_df.columns)
+    tasks = [(prices_df[ticker].dropna(), kwargs) for ticker in tickers]
+
+    if n_jobs == 1:
+        results = [_arima_ticker_signals(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            results = list(pool.map(_arima_ticker_signals, tasks))
+
+    return dict(zip(tickers, results))
+
 # lstm
-def run_lstm_strategy(prices, lookback=60, epochs=5):
+def make_windows(values, lookback):
+    """
+    Zero-copy sliding windows over a 1-D array for the LSTM.
+    Returns X with shape (samples, lookback, 1) where X[k] = values[k:k+lookback],
+    and y = values[lookback:] (the value right after each window).
+    """
+    values = np.asarray(values).reshape(-1)
+    X = sliding_window_view(values[:-1], lookback)[..., np.newaxis]
+    return X, values[lookback:]
 
-    if len(prices) <= lookback:
-         return pd.DataFrame(index=prices.index, columns=['positions']).fillna(0)
+LSTM_ARCH = 'lstm50-dense1' # part of the model store key, change it with build_lstm_model
+
+def build_lstm_model(lookback):
+    profiling.import_module('tensorflow') # timed for registry.import_report
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import LSTM, Dense
 
-    data = prices.values.reshape(-1, 1)
-    scaler = MinMaxScaler(feature_range=(0, 1))
-    scaled_data = scaler.fit_transform(data)
-    
-    X, y = [], []
-    for i in range(lookback, len(scaled_data)):
-        X.append(scaled_data[i-lookback:i, 0])
-        y.append(scaled_data[i, 0])
-    
-    X, y = np.array(X), np.array(y)
-    X = np.reshape(X, (X.shape[0], X.shape[1], 1))
-    
-    # train model
     model = Sequential()
-    model.add(LSTM(50, return_sequences=False, input_shape=(X.shape[1], 1)))
+    model.add(LSTM(50, return_sequences=False, input_shape=(lookback, 1)))
     model.add(Dense(1))
     model.compile(optimizer='adam', loss='mean_squared_error')
-    model.fit(X, y, epochs=epochs, batch_size=32, verbose=0)
-    
-    # predict
-    predicted_scaled = model.predict(X, verbose=0)
-    predicted_prices = scaler.inverse_transform(predicted_scaled)
-    
+    return model
+
+def lstm_signals_from_predictions(prices, predicted_prices, lookback):
+    """Moving-average crossover on the predicted prices, padded back to prices.index."""
     signals = pd.DataFrame(index=prices.index[lookback:])
     signals['price'] = prices[lookback:]
-    signals['predicted'] = predicted_prices.flatten()
+    signals['predicted'] = np.asarray(predicted_prices).flatten()
     
     
-    signals['short_ma'] = signals['predicted'].rolling(window=10).mean()
-    signals['long_ma'] = signals['predicted'].rolling(window=30).mean()
+    signals['short_ma'] = indicators.rolling_mean(signals['predicted'], 10)
+    signals['long_ma'] = indicators.rolling_mean(signals['predicted'], 30)
     
     signals['signal'] = np.where(signals['short_ma'] > signals['long_ma'], 1.0, 0.0)
     signals['positions'] = signals['signal'].diff()
@@ -115,4 +224,61 @@ def run_lstm_strategy(prices, lookback=60, epochs=5):
     full_signals['positions'] = signals['positions']
     full_signals = full_signals.fillna(0.0)
     
-    return full_signals
\ No newline at end of file
+    return full_signals
+
+def run_lstm_strategy(prices, lookback=60, epochs=5, store=None, finetune_epochs=1):
+    """
+    store: optional model_store.LSTMModelStore. With a store, a model trained
+    on the same prices is reused as is (through its frozen numpy copy, without
+    tensorflow), and one trained on an earlier prefix of them is only
+    fine-tuned on the new bars for `finetune_epochs`.
+    """
+
+    if len(prices) <= lookback:
+         return pd.DataFrame(index=prices.index, columns=['positions']).fillna(0)
+
+    data = prices.values.reshape(-1, 1)
+    # the store has one slot per ticker; an unnamed series gets a slot named
+    # after its data, so it can only be reused as is and never hits or extends
+    # another unnamed series' model
+    ticker = prices.name if prices.name is not None else f'series-{data_loader.fingerprint(prices)}'
+    status, entry = 'miss', None
+    if store is not None:
+        status, entry = store.lookup(ticker, prices, lookback, epochs, LSTM_ARCH)
+
+    if status == 'hit':
+        # nothing to train: serve the frozen numpy copy with its exported
+        # scaler, so tensorflow / sklearn are never imported
+        frozen = lstm_numpy.NumpyLSTM.load(entry['frozen'])
+        windows, _ = make_windows(data, lookback)
+        predicted_prices = frozen.predict_prices(windows[..., 0])
+        return lstm_signals_from_predictions(prices, predicted_prices, lookback)
+
+    model = build_lstm_model(lookback)
+    if status == 'miss':
+        MinMaxScaler = profiling.import_module('sklearn.preprocessing').MinMaxScaler
+        scaler = MinMaxScaler(feature_range=(0, 1))
+        scaled_data = scaler.fit_transform(data)
+    else:
+        # keep the stored scaler, refitting it would shift every input the model saw
+        scaler = store.load(entry, model)
+        scaled_data = scaler.transform(data)
+    
+    X, y = make_windows(scaled_data, lookback)
+    
+    # train model
+    if status == 'miss':
+        model.fit(X, y, epochs=epochs, batch_size=32, verbose=0)
+    elif status == 'extend':
+        # windows whose target is one of the appended bars
+        first_new = max(entry['n_bars'] - lookback, 0)
+        model.fit(X[first_new:], y[first_new:], epochs=finetune_epochs, batch_size=32, verbose=0)
+
+    if store is not None:
+        store.save(ticker, prices, lookback, epochs, LSTM_ARCH, model, scaler)
+    
+    # predict (numpy forward pass on the frozen weights, no keras predict overhead)
+    predicted_scaled = lstm_numpy.NumpyLSTM.from_keras(model).predict(X)
+    predicted_prices = scaler.inverse_transform(predicted_scaled)
+    
+    return lstm_signals_from_predictions(prices, predicted_prices, lookback)
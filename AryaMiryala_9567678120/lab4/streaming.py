@@ -0,0 +1,306 @@
+import time
+from math import comb
+import numpy as np
+import pandas as pd
+
+# event-driven mode: bars arrive one at a time from a generator, every
+# indicator updates in O(1) per bar and the Portfolio is updated with on_bar()
+# the streaming strategies give the same positions as generate_sma_signals /
+# generate_hybrid_signals in strategies.py, so a backtest replayed through
+# here matches the batch one and the same code can run on a live feed
+
+class RollingMean:
+    """Running-sum rolling mean over a ring buffer (pandas rolling().mean() semantics)."""
+
+    def __init__(self, window, min_periods=None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.buffer = np.zeros(window)
+        self.count = 0
+        self.total = 0.0
+
+    def update(self, x):
+        i = self.count % self.window
+        if self.count >= self.window:
+            self.total -= self.buffer[i]
+        self.buffer[i] = x
+        self.total += x
+        self.count += 1
+        # re-add the buffer once per lap so rounding error cannot build up
+        if i == self.window - 1:
+            self.total = self.buffer.sum()
+        return self.value
+
+    @property
+    def value(self):
+        n = min(self.count, self.window)
+        if n < self.min_periods or n == 0:
+            return np.nan
+        return self.total / n
+
+    def state(self):
+        return {'buffer': self.buffer.tolist(), 'count': self.count, 'total': self.total}
+
+    def load_state(self, state):
+        self.buffer = np.array(state['buffer'])
+        self.count = state['count']
+        self.total = state['total']
+
+class RollingRSI:
+    """RSI from rolling mean gains / losses, same formula as generate_hybrid_signals."""
+
+    def __init__(self, period=14):
+        self.gain = RollingMean(period)
+        self.loss = RollingMean(period)
+        self.last_price = None
+
+    def update(self, price):
+        # the first bar has no change, pandas counts it as a 0 gain and 0 loss
+        delta = 0.0 if self.last_price is None else price - self.last_price
+        self.last_price = price
+        gain = self.gain.update(delta if delta > 0 else 0.0)
+        loss = self.loss.update(-delta if delta < 0 else 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = np.float64(gain) / np.float64(loss)
+            return 100 - (100 / (1 + rs))
+
+    def state(self):
+        return {'gain': self.gain.state(), 'loss': self.loss.state(), 'last_price': self.last_price}
+
+    def load_state(self, state):
+        self.gain.load_state(state['gain'])
+        self.loss.load_state(state['loss'])
+        self.last_price = state['last_price']
+
+class StreamingSMA:
+    """Bar-by-bar generate_sma_signals: on_bar(price) returns that bar's positions value."""
+
+    def __init__(self, short_window=20, long_window=50):
+        self.short_window = short_window
+        self.short = RollingMean(short_window, min_periods=1)
+        self.long = RollingMean(long_window, min_periods=1)
+        self.n_bars = 0
+        self.last_signal = None
+
+    def _signal(self, price):
+        return 1.0 if self.short.update(price) > self.long.update(price) else 0.0
+
+    def on_bar(self, price):
+        signal = self._signal(price)
+        # same as signals.iloc[:short_window] = 0.0
+        if self.n_bars < self.short_window:
+            signal = 0.0
+        self.n_bars += 1
+
+        position = 0.0 if self.last_signal is None else signal - self.last_signal
+        self.last_signal = signal
+        return position
+
+    def state(self):
+        return {
+            'short': self.short.state(), 'long': self.long.state(),
+            'n_bars': self.n_bars, 'last_signal': self.last_signal,
+        }
+
+    def load_state(self, state):
+        self.short.load_state(state['short'])
+        self.long.load_state(state['long'])
+        self.n_bars = state['n_bars']
+        self.last_signal = state['last_signal']
+
+class StreamingHybrid(StreamingSMA):
+    """Bar-by-bar generate_hybrid_signals (SMA crossover filtered by RSI < 70)."""
+
+    def __init__(self, short_window=20, long_window=50, rsi_period=14):
+        super().__init__(short_window, long_window)
+        # the hybrid strategy waits for full windows
+        self.short.min_periods = short_window
+        self.long.min_periods = long_window
+        self.rsi = RollingRSI(rsi_period)
+
+    def _signal(self, price):
+        trend = self.short.update(price) > self.long.update(price)
+        rsi = self.rsi.update(price)
+        return 1.0 if trend and rsi < 70 else 0.0
+
+    def state(self):
+        state = super().state()
+        state['rsi'] = self.rsi.state()
+        return state
+
+    def load_state(self, state):
+        super().load_state(state)
+        self.rsi.load_state(state['rsi'])
+
+class StreamingARIMA:
+    """
+    Bar-by-bar ARIMA signals from fixed params: the one-step prediction for
+    each bar against its price, like arima_batch.generate_arima_batch_signals.
+    Pure AR orders only (q = 0), so a prediction needs just the last p + d
+    prices; the first p + d bars give no signal. Params stay as given, refit
+    with arima_batch.fit_arima_batch and build a new instance to update them.
+    """
+
+    def __init__(self, params=None, order=(5,1,0)):
+        """
+        params: fitted params in statsmodels order (const if d == 0, ar, sigma2),
+                None (e.g. a failed fit) never trades
+        """
+        p, d, q = order
+        if q:
+            raise ValueError(f"StreamingARIMA needs a pure AR order (q = 0), got {tuple(order)}")
+        self.order = tuple(order)
+        self.params = None if params is None else np.asarray(params, dtype=np.float64)
+        self.history = []
+        self.last_signal = None
+
+    def predict(self):
+        """Prediction for the next bar from the prices seen so far (nan until p + d bars)."""
+        p, d, _ = self.order
+        if self.params is None or len(self.history) < p + d:
+            return np.nan
+        y = np.asarray(self.history)
+        const = self.params[0] if d == 0 else 0.0
+        ar = self.params[1:p + 1] if d == 0 else self.params[:p]
+        w = np.diff(y, n=d) if d else y
+        # statsmodels' const is the mean of the (differenced) series
+        pred = const + np.dot(ar, w[::-1][:p] - const)
+        # undo the differencing: y_t = w_t - sum_k (-1)^k C(d, k) y_{t-k}
+        return pred - sum((-1) ** k * comb(d, k) * y[-k] for k in range(1, d + 1))
+
+    def on_bar(self, price):
+        predicted = self.predict()
+        signal = 1.0 if predicted > price else 0.0
+        position = 0.0 if self.last_signal is None else signal - self.last_signal
+        self.last_signal = signal
+
+        p, d, _ = self.order
+        self.history.append(price)
+        self.history = self.history[-(p + d):] if p + d else []
+        return position
+
+    def state(self):
+        return {
+            'params': None if self.params is None else self.params.tolist(),
+            'order': list(self.order), 'history': list(self.history), 'last_signal': self.last_signal,
+        }
+
+    def load_state(self, state):
+        self.params = None if state['params'] is None else np.asarray(state['params'])
+        self.order = tuple(state['order'])
+        self.history = list(state['history'])
+        self.last_signal = state['last_signal']
+
+class StreamingLSTM:
+    """
+    Bar-by-bar run_lstm_strategy signals from a frozen model (the .npz that
+    model_store / lstm_numpy.export_lstm writes): each bar is predicted from
+    the previous `lookback` prices, then the 10 / 30 moving-average crossover
+    of the predictions gives the position. The model is not retrained here.
+    """
+
+    def __init__(self, model_path=None, lookback=60):
+        self.lookback = lookback
+        self.short = RollingMean(10)
+        self.long = RollingMean(30)
+        self.window = []
+        self.last_signal = None
+        self._load_model(model_path)
+
+    def _load_model(self, model_path):
+        import lstm_numpy
+        self.model_path = model_path
+        self.model = None if model_path is None else lstm_numpy.NumpyLSTM.load(model_path)
+
+    def on_bar(self, price):
+        position = 0.0
+        # no model: the history was too short to train one, like run_lstm_strategy it never trades
+        if self.model is not None and len(self.window) == self.lookback:
+            predicted = self.model.predict_prices(np.asarray(self.window)[None, :])[0]
+            trend = self.short.update(predicted) > self.long.update(predicted)
+            signal = 1.0 if trend else 0.0
+            position = 0.0 if self.last_signal is None else signal - self.last_signal
+            self.last_signal = signal
+        self.window.append(price)
+        del self.window[:-self.lookback]
+        return position
+
+    def state(self):
+        return {
+            'model_path': self.model_path, 'lookback': self.lookback, 'window': list(self.window),
+            'short': self.short.state(), 'long': self.long.state(), 'last_signal': self.last_signal,
+        }
+
+    def load_state(self, state):
+        self._load_model(state['model_path'])
+        self.lookback = state['lookback']
+        self.window = list(state['window'])
+        self.short.load_state(state['short'])
+        self.long.load_state(state['long'])
+        self.last_signal = state['last_signal']
+
+STREAMING_STRATEGIES = {'sma': StreamingSMA, 'hybrid': StreamingHybrid, 'arima': StreamingARIMA, 'lstm': StreamingLSTM}
+
+def frame_bars(price_df):
+    """Replays a wide price DataFrame as (date, {ticker: price}) bars."""
+    tickers = list(price_df.columns)
+    for date, row in zip(price_df.index, price_df.to_numpy()):
+        yield date, dict(zip(tickers, row))
+
+def live_bars(tickers, interval='1m', poll_seconds=60):
+    """
+    Polls yfinance and yields (timestamp, {ticker: price}) whenever a new
+    bar closes, for paper trading with run_stream. Runs until interrupted.
+    """
+    import data_loader
+
+    last_seen = None
+    while True:
+        now = pd.Timestamp.now(tz='UTC')
+        data = data_loader._download_close(tickers, now - pd.Timedelta(days=1), now + pd.Timedelta(days=1), interval)
+        data = data.dropna(how='all')
+        # the newest row is the bar still forming, the one before it is final
+        if len(data) >= 2 and data.index[-2] != last_seen:
+            last_seen = data.index[-2]
+            yield last_seen, data.iloc[-2].to_dict()
+        time.sleep(poll_seconds)
+
+def run_stream(bars, portfolio, strategy='sma', states=None, **params):
+    """
+    Drives `portfolio` (a backtester.Portfolio) from a bar generator.
+    strategy: 'sma' / 'hybrid' / 'arima' / 'lstm' or a class with on_bar(price); params go to it
+    states: {ticker: strategy instance} to carry on from (updated in place),
+            tickers missing from it get a new instance
+    Returns (equity DataFrame from portfolio.ledger, latency dict with per-bar microseconds).
+    """
+    make = STREAMING_STRATEGIES[strategy] if isinstance(strategy, str) else strategy
+    states = {} if states is None else states
+    latencies = []
+
+    for date, prices in bars:
+        start = time.perf_counter_ns()
+        signals = {}
+        for ticker, price in prices.items():
+            # a missing bar does not move the indicators, like dropna() in batch mode
+            if price != price:
+                continue
+            if ticker not in states:
+                states[ticker] = make(**params)
+            signals[ticker] = states[ticker].on_bar(price)
+        portfolio.on_bar(date, prices, signals)
+        latencies.append(time.perf_counter_ns() - start)
+
+    return portfolio.ledger.equity_frame(), latency_report(latencies)
+
+def latency_report(latencies_ns):
+    """Summary of per-bar processing time in microseconds."""
+    if not latencies_ns:
+        return {'bars': 0}
+    us = np.asarray(latencies_ns) / 1000.0
+    return {
+        'bars': len(us),
+        'mean_us': float(us.mean()),
+        'p50_us': float(np.percentile(us, 50)),
+        'p99_us': float(np.percentile(us, 99)),
+        'max_us': float(us.max()),
+    }
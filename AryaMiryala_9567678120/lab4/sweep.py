@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+import crossover
+
+# parameter sweeps for the sma / hybrid strategies in strategies.py
+# every rolling mean is built once per window from a cumulative sum and the
+# whole parameter grid is turned into a (combos, dates) signal array at once
+
+CHUNK_SIZE = 512 # combos evaluated per block, keeps memory flat for big grids
+
+def param_grid(short_windows, long_windows, rsi_periods=None):
+    """
+    All (short_window, long_window[, rsi_period]) combos with short < long.
+    Returns a DataFrame with one row per combo.
+    """
+    short_windows = np.asarray(short_windows)
+    long_windows = np.asarray(long_windows)
+    s, l = np.meshgrid(short_windows, long_windows, indexing='ij')
+    keep = s < l
+    grid = pd.DataFrame({'short_window': s[keep], 'long_window': l[keep]})
+
+    if rsi_periods is not None:
+        grid = grid.merge(pd.DataFrame({'rsi_period': np.asarray(rsi_periods)}), how='cross')
+    return grid
+
+def rolling_means(values, windows, min_periods=None):
+    """
+    Rolling means along the first axis for every window. values is a 1-D
+    array or a (dates, series) one, the result has shape
+    (len(windows),) + values.shape.
+    min_periods=1 matches prices.rolling(w, min_periods=1).mean(), None matches
+    prices.rolling(w).mean() (NaN until the window is full).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    # center on the first value so the cumulative sum does not lose precision
+    offset = values[0] if n else 0.0
+    csum = np.concatenate((np.zeros((1,) + values.shape[1:]), np.cumsum(values - offset, axis=0)))
+    t = np.arange(1, n + 1)
+    column = (slice(None),) + (None,) * (values.ndim - 1) # per-date numbers against every series
+
+    out = np.empty((len(windows),) + values.shape)
+    for i, w in enumerate(windows):
+        start = np.maximum(t - w, 0)
+        counts = t - start
+        out[i] = (csum[t] - csum[start]) / counts[column] + offset
+        if min_periods is None:
+            out[i, :w - 1] = np.nan
+        elif min_periods > 1:
+            out[i, counts < min_periods] = np.nan
+    return out
+
+def rolling_rsi(values, periods):
+    """RSI for every period (along the first axis), same formula as generate_hybrid_signals."""
+    values = np.asarray(values, dtype=np.float64)
+    # the leading NaN delta becomes 0 here, same as delta.where(...)
+    delta = np.diff(values, axis=0, prepend=np.nan)
+    gain = rolling_means(np.where(delta > 0, delta, 0.0), periods)
+    loss = rolling_means(np.where(delta < 0, -delta, 0.0), periods)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = gain / loss
+        return 100 - (100 / (1 + rs))
+
+def signal_grid(prices, grid, strategy='sma'):
+    """
+    Crossover signals for every combo in grid, shape (combos, dates), int8.
+    strategy: 'sma' (generate_sma_signals) or 'hybrid' (generate_hybrid_signals)
+    """
+    values = np.asarray(prices, dtype=np.float64)
+    short = grid['short_window'].to_numpy()
+    long = grid['long_window'].to_numpy()
+
+    min_periods = 1 if strategy == 'sma' else None
+    windows, inverse = np.unique(np.concatenate([short, long]), return_inverse=True)
+    means = rolling_means(values, windows, min_periods=min_periods)
+    short_idx, long_idx = inverse[:len(short)], inverse[len(short):]
+
+    signal = means[short_idx] > means[long_idx]
+
+    if strategy == 'hybrid':
+        periods, rsi_idx = np.unique(grid['rsi_period'].to_numpy(), return_inverse=True)
+        rsi = rolling_rsi(values, periods)
+        signal &= rsi[rsi_idx] < 70
+    elif strategy != 'sma':
+        raise ValueError(f"Unknown strategy: {strategy}")
+
+    # same as signals.iloc[:short_window] = 0.0
+    signal &= np.arange(len(values))[None, :] >= short[:, None]
+    return signal.astype(np.int8)
+
+def positions_grid(prices, grid, strategy='sma'):
+    """
+    The 'positions' column (signal.diff()) for every combo, shape (combos, dates).
+    The first date is 0 instead of NaN, which the backtester treats the same way.
+    """
+    return crossover.regime_changes(signal_grid(prices, grid, strategy), axis=1)
+
+def equity_grid(prices, grid, strategy='sma', initial_capital=1.0):
+    """
+    Equity curve of every combo under the same holding rule as evaluate_grid,
+    shape (combos, dates), ready for metrics.equity_metrics.
+    """
+    values = np.asarray(prices, dtype=np.float64)
+    held = signal_grid(values, grid, strategy)[:, :-1].astype(np.float64)
+    growth = np.cumsum(held * np.diff(np.log(values))[None, :], axis=1)
+    curves = np.empty((len(grid), len(values)))
+    curves[:, 0] = initial_capital
+    curves[:, 1:] = initial_capital * np.exp(growth)
+    return curves
+
+def evaluate_grid(prices, grid, strategy='sma', periods_per_year=252):
+    """
+    Scores every combo on one price series: holding while signal == 1 and
+    earning the next bar's return. Returns grid with total_return, sharpe
+    and n_trades columns added.
+    periods_per_year: annualization for the Sharpe ratio (252 = daily bars)
+    """
+    values = np.asarray(prices, dtype=np.float64)
+    log_ret = np.diff(np.log(values))
+
+    total = np.empty(len(grid))
+    sharpe = np.empty(len(grid))
+    trades = np.empty(len(grid), dtype=np.int64)
+
+    for start in range(0, len(grid), CHUNK_SIZE):
+        block = grid.iloc[start:start + CHUNK_SIZE]
+        signal = signal_grid(values, block, strategy)
+        held = signal[:, :-1].astype(np.float64)
+
+        strat_ret = held * log_ret[None, :]
+        stop = start + len(block)
+        total[start:stop] = np.expm1(strat_ret.sum(axis=1))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe[start:stop] = np.sqrt(periods_per_year) * strat_ret.mean(axis=1) / strat_ret.std(axis=1, ddof=1)
+        trades[start:stop] = np.count_nonzero(np.diff(signal, axis=1), axis=1)
+
+    result = grid.copy()
+    result['total_return'] = total
+    result['sharpe'] = sharpe
+    result['n_trades'] = trades
+    return result
+
+def _evaluate_ticker(args):
+    ticker, values, grid, strategy, periods_per_year = args
+    result = evaluate_grid(values, grid, strategy, periods_per_year)
+    result.insert(0, 'ticker', ticker)
+    return result
+
+def sweep_universe(prices_df, grid, strategy='sma', n_jobs=None, periods_per_year=252):
+    """
+    Runs evaluate_grid for every ticker in prices_df across a process pool.
+    n_jobs: worker processes (None = one per core, 1 = run in this process)
+    Returns one long DataFrame with a row per (ticker, combo).
+    """
+    tasks = [
+        (ticker, prices_df[ticker].dropna().to_numpy(), grid, strategy, periods_per_year)
+        for ticker in prices_df.columns
+    ]
+
+    if n_jobs == 1:
+        results = [_evaluate_ticker(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            results = list(pool.map(_evaluate_ticker, tasks))
+
+    return pd.concat(results, ignore_index=True)
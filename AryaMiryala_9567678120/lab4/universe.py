@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+import price_store
+
+# lazy, block-wise view of a universe kept in a price_store.PriceStore
+# nothing is loaded up front: signal generation pulls blocks of tickers, the
+# backtester pulls blocks of dates across all tickers, and peak memory is set by
+# the block size instead of the universe size
+
+class LazyUniverse:
+    def __init__(self, store, tickers=None, start=None, end=None, block_size=100):
+        """
+        store: price_store.PriceStore holding the bars
+        tickers: list of tickers (None = everything in the store)
+        block_size: tickers per block in ticker_blocks()
+        """
+        self.store = store
+        self.tickers = list(tickers) if tickers is not None else store.tickers()
+        self.start = None if start is None else price_store.to_ns([start])[0]
+        self.end = None if end is None else price_store.to_ns([end])[0]
+        self.block_size = block_size
+        self._calendar = None
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def _slice(self, ticker, lo_ns=None, hi_ns=None):
+        # memory-mapped columns, only the pages inside [lo_ns, hi_ns) get read
+        ts, close = self.store.columns(ticker)
+        lo_ns = self.start if lo_ns is None else lo_ns
+        hi_ns = self.end if hi_ns is None else hi_ns
+        lo = 0 if lo_ns is None else np.searchsorted(ts, lo_ns, side='left')
+        hi = len(ts) if hi_ns is None else np.searchsorted(ts, hi_ns, side='left')
+        return np.asarray(ts[lo:hi]), np.asarray(close[lo:hi])
+
+    def calendar(self):
+        """Sorted int64 timestamps of every bar any ticker has (built once, one ticker at a time)."""
+        if self._calendar is None:
+            cal = np.zeros(0, dtype=np.int64)
+            for ticker in self.tickers:
+                cal = np.union1d(cal, self._slice(ticker)[0])
+            self._calendar = cal
+        return self._calendar
+
+    def dates(self):
+        return pd.DatetimeIndex(self.calendar().astype('datetime64[ns]'), name='Date')
+
+    def load(self, ticker):
+        """One ticker as a Series (no NaNs), like prices_df[ticker].dropna()."""
+        ts, close = self._slice(ticker)
+        return pd.Series(close, index=pd.DatetimeIndex(ts.astype('datetime64[ns]'), name='Date'), name=ticker)
+
+    def ticker_blocks(self):
+        """Yields wide DataFrames of `block_size` tickers each, over their own dates."""
+        for i in range(0, len(self.tickers), self.block_size):
+            block = self.tickers[i:i + self.block_size]
+            df = pd.concat([self.load(t) for t in block], axis=1)
+            df.columns = block
+            yield df
+
+    def date_blocks(self, rows=2000):
+        """
+        Yields (first_row, prices) where prices is a (rows, tickers) float array
+        for consecutive calendar rows, NaN where a ticker has no bar.
+        """
+        cal = self.calendar()
+        for first in range(0, len(cal), rows):
+            block_cal = cal[first:first + rows]
+            prices = np.full((len(block_cal), len(self.tickers)), np.nan)
+            for j, ticker in enumerate(self.tickers):
+                ts, close = self._slice(ticker, block_cal[0], block_cal[-1] + 1)
+                prices[np.searchsorted(block_cal, ts), j] = close
+            yield first, prices
+
+def block_positions(universe, signal_fn, path=None):
+    """
+    Runs signal_fn (e.g. strategies.generate_sma_signals) over the universe one
+    ticker block at a time and collects the 'positions' column into a dense
+    (calendar dates, tickers) int8 matrix. With `path` the matrix is an
+    on-disk np.memmap, so it never has to fit in memory either.
+    """
+    cal = universe.calendar()
+    shape = (len(cal), len(universe))
+    if path is None:
+        positions = np.zeros(shape, dtype=np.int8)
+    else:
+        positions = np.lib.format.open_memmap(path, mode='w+', dtype=np.int8, shape=shape)
+
+    col = 0
+    for block in universe.ticker_blocks():
+        for ticker in block.columns:
+            prices = block[ticker].dropna()
+            pos = signal_fn(prices)['positions'].fillna(0.0)
+            rows = np.searchsorted(cal, price_store.to_ns(pos.index))
+            positions[rows, col] = pos.to_numpy().astype(np.int8)
+            col += 1
+
+    if path is not None:
+        positions.flush()
+    return positions